@@ -0,0 +1,291 @@
+import argparse
+import json
+import os
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from calibration_io import CalibrationTransformer, load_calibration
+from dlc_data import read_dlc_file
+from transform import check_output_path, temporary_output_path
+
+KINEMATIC_FIELDS = ('x', 'y', 'vx', 'vy', 'speed', 'ax', 'ay', 'acceleration', 'distance', 'interpolated')
+
+
+def interpolate_gaps(position: np.ndarray, valid: np.ndarray, max_gap: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Linearly fill runs of at most ``max_gap`` invalid frames along axis 0
+
+    ``position`` has shape (frames, tracks, 2) and ``valid`` (frames,
+    tracks). Every track is filled at once from the index of the previous
+    and next valid frame, found with running max/min accumulations. Gaps
+    at the ends or longer than ``max_gap`` stay NaN. Returns the filled
+    positions and the mask of filled points.
+    """
+    n = len(position)
+    frame = np.arange(n)[:, None]
+    previous = np.maximum.accumulate(np.where(valid, frame, -1), axis=0)
+    following = np.minimum.accumulate(np.where(valid, frame, n)[::-1], axis=0)[::-1]
+    filled = ~valid & (previous >= 0) & (following < n) & (following - previous - 1 <= max_gap)
+    out = np.where(valid[..., None], position, np.nan)
+    if filled.any():
+        frames, tracks = np.nonzero(filled)
+        before = previous[frames, tracks]
+        after = following[frames, tracks]
+        weight = ((frames - before) / (after - before))[:, None]
+        out[frames, tracks] = (position[before, tracks] * (1.0 - weight) + position[after, tracks] * weight)
+    return out, filled
+
+
+def points_in_polygon(points: np.ndarray, polygon: np.ndarray) -> np.ndarray:
+    """Even-odd test of an (..., 2) array of points against a polygon's vertices
+
+    All points are tested against all edges in one broadcast; NaN points
+    are outside.
+    """
+    polygon = np.asarray(polygon, dtype=np.float64)
+    x1, y1 = polygon[:, 0], polygon[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+    x = points[..., 0, None]
+    y = points[..., 1, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        crosses = (y1 > y) != (y2 > y)
+        x_cross = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+        return np.count_nonzero(crosses & (x < x_cross), axis=-1) % 2 == 1
+
+
+def iter_kinematics(coords: np.ndarray, calibration: CalibrationTransformer, bodypart_index: int, fps: float,
+                    likelihood_threshold: float = 0.6, max_gap: int = 15,
+                    chunk_size: int = 50000) -> Iterator[Dict[str, np.ndarray]]:
+    """World-space position, velocity and acceleration of one bodypart, chunk by chunk
+
+    ``coords`` is a (frames, individuals, bodyparts, 3) pixel coordinate
+    index, typically the memory-mapped DLC cache, so only the frames of
+    the current chunk are read. Points below ``likelihood_threshold`` are
+    dropped and gaps of up to ``max_gap`` frames are interpolated in world
+    coordinates. Velocity (world units/s) and acceleration (world
+    units/s²) are central differences at ``fps``.
+
+    Every chunk is processed with ``max_gap + 3`` frames of context on
+    both sides, so interpolation and differences across chunk boundaries
+    match a single pass over the whole recording. Yields dicts with the
+    chunk's ``start`` frame and (frames, individuals[, 2]) arrays
+    ``position``, ``velocity``, ``speed``, ``acceleration``, ``step``
+    (distance from the previous frame, 0 across gaps) and
+    ``interpolated``.
+    """
+    total = len(coords)
+    pad = max_gap + 3
+    dt = 1.0 / fps
+    for start in range(0, total, chunk_size):
+        stop = min(start + chunk_size, total)
+        lo, hi = max(start - pad, 0), min(stop + pad, total)
+        window = np.asarray(coords[lo:hi, :, bodypart_index], dtype=np.float64)
+        with np.errstate(invalid='ignore'):
+            valid = np.isfinite(window[..., :2]).all(axis=-1) & (window[..., 2] >= likelihood_threshold)
+        world = calibration.pixel_to_world(np.where(valid[..., None], window[..., :2], np.nan))
+        valid &= np.isfinite(world).all(axis=-1)
+        position, interpolated = interpolate_gaps(world, valid, max_gap)
+        if len(position) > 1:
+            velocity = np.gradient(position, dt, axis=0)
+            acceleration = np.gradient(velocity, dt, axis=0) if len(position) > 2 else np.zeros_like(velocity)
+        else:
+            velocity = np.full_like(position, np.nan)
+            acceleration = np.full_like(position, np.nan)
+        step = np.zeros(position.shape[:2])
+        step[1:] = np.linalg.norm(np.diff(position, axis=0), axis=-1)
+        core = slice(start - lo, stop - lo)
+        yield {
+            'start': start,
+            'position': position[core],
+            'velocity': velocity[core],
+            'speed': np.linalg.norm(velocity[core], axis=-1),
+            'acceleration': acceleration[core],
+            'step': np.nan_to_num(step[core], nan=0.0),
+            'interpolated': interpolated[core],
+        }
+
+
+def occupancy_bins(points: np.ndarray, extent: Tuple[float, float, float, float],
+                   bins: Tuple[int, int]) -> np.ndarray:
+    """Flat (track, row, column) histogram index of (frames, tracks, 2) points, -1 outside the extent"""
+    x_min, x_max, y_min, y_max = extent
+    columns, rows = bins
+    with np.errstate(invalid='ignore'):
+        col = np.floor((points[..., 0] - x_min) * (columns / (x_max - x_min)))
+        row = np.floor((points[..., 1] - y_min) * (rows / (y_max - y_min)))
+        inside = (col >= 0) & (col < columns) & (row >= 0) & (row < rows)
+    track = np.broadcast_to(np.arange(points.shape[1]), inside.shape)
+    row = np.where(inside, row, 0).astype(np.intp)
+    col = np.where(inside, col, 0).astype(np.intp)
+    flat = (track * rows + row) * columns + col
+    return np.where(inside, flat, -1)
+
+
+def analyze_trajectories(coords: np.ndarray, calibration: CalibrationTransformer, bodypart_index: int,
+                         fps: float, individuals: Optional[Sequence[str]] = None,
+                         zones: Optional[Dict[str, Sequence[Sequence[float]]]] = None,
+                         extent: Optional[Tuple[float, float, float, float]] = None,
+                         bins: Tuple[int, int] = (50, 50), likelihood_threshold: float = 0.6,
+                         max_gap: int = 15, chunk_size: int = 50000, output_path: Optional[str] = None,
+                         input_path: Optional[str] = None) -> dict:
+    """Distance travelled, speed, zone dwell times and occupancy of one bodypart
+
+    ``zones`` maps names to world-space polygons. ``extent`` is (x_min,
+    x_max, y_min, y_max) of the occupancy grid, by default the bounds of
+    the calibration's world points; occupancy is in seconds per bin with
+    shape (individuals, rows, columns), rows along world y. With
+    ``output_path`` the per-frame kinematics are appended chunk by chunk
+    to a CSV, or H5 when it ends in .h5, through a temporary file that
+    replaces the output once complete; ``input_path`` (the DLC file) is
+    never overwritten. Memory use depends on ``chunk_size``, not on the
+    recording length.
+    """
+    if output_path is not None:
+        check_output_path(input_path, output_path)
+    n_individuals = coords.shape[1]
+    if individuals is None:
+        individuals = [str(i) for i in range(n_individuals)]
+    # Single-animal tables have one unnamed individual
+    individuals = [name or 'single' for name in individuals]
+    zones = {name: np.asarray(polygon, dtype=np.float64) for name, polygon in (zones or {}).items()}
+    if extent is None and len(calibration.world_points):
+        world_points = np.asarray(calibration.world_points, dtype=np.float64)
+        extent = (world_points[:, 0].min(), world_points[:, 0].max(),
+                  world_points[:, 1].min(), world_points[:, 1].max())
+    columns, rows = bins
+    occupancy = np.zeros(n_individuals * rows * columns, dtype=np.int64)
+    distance = np.zeros(n_individuals)
+    tracked = np.zeros(n_individuals, dtype=np.int64)
+    interpolated = np.zeros(n_individuals, dtype=np.int64)
+    speed_sum = np.zeros(n_individuals)
+    speed_count = np.zeros(n_individuals, dtype=np.int64)
+    max_speed = np.zeros(n_individuals)
+    zone_frames = {name: np.zeros(n_individuals, dtype=np.int64) for name in zones}
+    to_h5 = output_path is not None and output_path.lower().endswith(('.h5', '.hdf5'))
+    temp_path = temporary_output_path(output_path) if output_path is not None else None
+    header = pd.MultiIndex.from_product([individuals, KINEMATIC_FIELDS], names=['individuals', 'coords'])
+
+    try:
+        for chunk in iter_kinematics(coords, calibration, bodypart_index, fps, likelihood_threshold,
+                                     max_gap, chunk_size):
+            position, speed = chunk['position'], chunk['speed']
+            present = np.isfinite(position).all(axis=-1)
+            tracked += present.sum(axis=0)
+            interpolated += chunk['interpolated'].sum(axis=0)
+            running = distance[None, :] + np.cumsum(chunk['step'], axis=0)
+            distance = running[-1].copy() if len(running) else distance
+            finite_speed = np.isfinite(speed)
+            speed = np.where(finite_speed, speed, 0.0)
+            speed_sum += speed.sum(axis=0)
+            speed_count += finite_speed.sum(axis=0)
+            max_speed = np.maximum(max_speed, speed.max(axis=0, initial=0.0))
+            for name, polygon in zones.items():
+                zone_frames[name] += points_in_polygon(position, polygon).sum(axis=0)
+            if extent is not None:
+                flat = occupancy_bins(position, extent, bins)
+                occupancy += np.bincount(flat[flat >= 0], minlength=occupancy.size)
+            if output_path is not None:
+                values = np.concatenate([position, chunk['velocity'], chunk['speed'][..., None], chunk['acceleration'],
+                                         np.linalg.norm(chunk['acceleration'], axis=-1)[..., None],
+                                         running[..., None], chunk['interpolated'][..., None]], axis=-1)
+                index = pd.RangeIndex(chunk['start'], chunk['start'] + len(position), name='frame')
+                frame = pd.DataFrame(values.reshape(len(position), -1), index=index, columns=header)
+                if to_h5:
+                    frame.to_hdf(temp_path, key='df_with_missing', format='table', append=True,
+                                 mode='a' if chunk['start'] else 'w')
+                else:
+                    frame.to_csv(temp_path, mode='a', header=(chunk['start'] == 0))
+        if temp_path is not None:
+            os.replace(temp_path, output_path)
+    finally:
+        if temp_path is not None and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    dt = 1.0 / fps
+    summary = {}
+    for i, name in enumerate(individuals):
+        summary[name] = {
+            'distance': float(distance[i]),
+            'tracked_s': float(tracked[i] * dt),
+            'tracked_fraction': float(tracked[i] / len(coords)) if len(coords) else 0.0,
+            'interpolated_frames': int(interpolated[i]),
+            'mean_speed': float(speed_sum[i] / speed_count[i]) if speed_count[i] else None,
+            'max_speed': float(max_speed[i]),
+            'zone_dwell_s': {zone: float(frames[i] * dt) for zone, frames in zone_frames.items()},
+        }
+    return {
+        'frames': len(coords),
+        'fps': fps,
+        'individuals': summary,
+        'occupancy_s': occupancy.reshape(n_individuals, rows, columns) * dt if extent is not None else None,
+        'extent': None if extent is None else [float(v) for v in extent],
+        'output_path': output_path,
+    }
+
+
+def load_zones(path: str) -> Dict[str, List[List[float]]]:
+    """Zones from a JSON file mapping names to lists of [x, y] world vertices"""
+    with open(path, 'r') as f:
+        zones = json.load(f)
+    for name, polygon in zones.items():
+        if len(polygon) < 3:
+            raise ValueError(f"Zone '{name}' needs at least 3 vertices")
+    return zones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kinematics, zone dwell times and occupancy in world coordinates")
+    parser.add_argument('input', help="DeepLabCut CSV or H5 file")
+    parser.add_argument('calibration', help="Saved calibration file")
+    parser.add_argument('--bodypart', help="Bodypart to analyse (default: the one used for calibration)")
+    parser.add_argument('--fps', type=float, help="Frame rate (default: from the calibration)")
+    parser.add_argument('--zones', help="JSON file mapping zone names to [[x, y], ...] world polygons")
+    parser.add_argument('--bins', type=int, nargs=2, default=(50, 50), metavar=('COLUMNS', 'ROWS'),
+                        help="Occupancy grid size (default: 50 50)")
+    parser.add_argument('--extent', type=float, nargs=4, metavar=('X_MIN', 'X_MAX', 'Y_MIN', 'Y_MAX'),
+                        help="Occupancy grid bounds (default: bounds of the calibration points)")
+    parser.add_argument('--likelihood', type=float, default=0.6,
+                        help="Points below this likelihood are interpolated or dropped (default: 0.6)")
+    parser.add_argument('--max-gap', type=int, default=15,
+                        help="Longest run of dropped frames that is interpolated (default: 15)")
+    parser.add_argument('--chunk-size', type=int, default=50000,
+                        help="Frames processed per chunk (default: 50000)")
+    parser.add_argument('-o', '--output', help="Per-frame kinematics, .csv or .h5 (default: not written)")
+    parser.add_argument('--summary', help="Summary JSON (default: <input>_analytics.json)")
+    parser.add_argument('--allow-pickle', action='store_true',
+                        help="Allow reading legacy .pkl calibrations (only from trusted sources)")
+    args = parser.parse_args()
+
+    calibration = load_calibration(args.calibration, allow_pickle=args.allow_pickle)
+    coords, individuals, bodyparts, _ = read_dlc_file(args.input)
+    bodypart = args.bodypart or calibration.metadata.get('selected_bodypart')
+    if bodypart not in bodyparts:
+        parser.error(f"Bodypart {bodypart!r} not found; available: {', '.join(bodyparts)}")
+    fps = args.fps or calibration.metadata.get('fps')
+    if not fps:
+        parser.error("Frame rate unknown; pass --fps")
+    zones = load_zones(args.zones) if args.zones else None
+    try:
+        result = analyze_trajectories(coords, calibration, bodyparts.index(bodypart), float(fps),
+                                      individuals, zones, args.extent, tuple(args.bins), args.likelihood,
+                                      args.max_gap, args.chunk_size, args.output, input_path=args.input)
+    except ValueError as e:
+        parser.error(str(e))
+
+    summary_path = args.summary or f"{os.path.splitext(args.input)[0]}_analytics.json"
+    occupancy = result.pop('occupancy_s')
+    if occupancy is not None:
+        occupancy_path = os.path.splitext(summary_path)[0] + '_occupancy.npy'
+        np.save(occupancy_path, occupancy)
+        result['occupancy_path'] = occupancy_path
+    with open(summary_path, 'w') as f:
+        json.dump(dict(result, bodypart=bodypart), f, indent=2)
+    for name, stats in result['individuals'].items():
+        print(f"{name}: distance {stats['distance']:.1f}, tracked {stats['tracked_fraction']:.1%}, "
+              f"mean speed {stats['mean_speed'] or 0:.2f}/s")
+        for zone, seconds in stats['zone_dwell_s'].items():
+            print(f"  {zone}: {seconds:.1f} s")
+    print(f"Summary saved to: {summary_path}")
+
+
+if __name__ == "__main__":
+    main()
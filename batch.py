@@ -0,0 +1,174 @@
+import argparse
+import csv
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from typing import Callable, Dict, List, Sequence
+from calibration_io import load_calibration
+from transform import transform_dlc, default_output_path
+
+REPORT_FIELDS = ['input_path', 'calibration_path', 'output_path', 'status', 'rows', 'masked_points', 'seconds', 'error']
+
+
+def read_manifest(manifest_path: str) -> List[Dict[str, str]]:
+    """Read batch jobs from a CSV or JSON manifest
+
+    Each entry needs ``dlc_path`` and ``calibration_path``; ``output_path``
+    is optional and defaults to ``<dlc>_world.<ext>``.
+    """
+    if manifest_path.lower().endswith('.json'):
+        with open(manifest_path, 'r') as f:
+            entries = json.load(f)
+    else:
+        with open(manifest_path, 'r', newline='') as f:
+            entries = list(csv.DictReader(f))
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    jobs = []
+    for entry in entries:
+        # Relative paths in a manifest are relative to the manifest itself
+        dlc_path = os.path.join(base_dir, entry['dlc_path'])
+        jobs.append({
+            'dlc_path': dlc_path,
+            'calibration_path': os.path.join(base_dir, entry['calibration_path']),
+            'output_path': os.path.join(base_dir, entry['output_path']) if entry.get('output_path')
+                           else default_output_path(dlc_path),
+        })
+    return jobs
+
+
+def glob_jobs(pattern: str, calibration_path: str, output_dir: str = None) -> List[Dict[str, str]]:
+    """Build batch jobs for every file matching ``pattern`` with one shared calibration
+
+    Outputs of earlier runs (``*_world.<ext>`` files, or anything inside
+    ``output_dir``) are skipped so rerunning a batch does not convert them
+    again.
+    """
+    jobs = []
+    output_root = os.path.abspath(output_dir) if output_dir else None
+    for dlc_path in sorted(glob.glob(pattern, recursive=True)):
+        if os.path.splitext(dlc_path)[0].endswith('_world'):
+            continue
+        if output_root and os.path.commonpath([output_root, os.path.abspath(dlc_path)]) == output_root:
+            continue
+        output_path = default_output_path(dlc_path)
+        if output_dir:
+            output_path = os.path.join(output_dir, os.path.basename(output_path))
+        jobs.append({'dlc_path': dlc_path, 'calibration_path': calibration_path, 'output_path': output_path})
+    return jobs
+
+
+@lru_cache(maxsize=32)
+def cached_calibration(calibration_path: str, allow_pickle: bool):
+    # Each worker process loads a shared calibration only once
+    return load_calibration(calibration_path, allow_pickle=allow_pickle)
+
+
+def run_job(job: Dict[str, str], likelihood_threshold: float, chunk_size: int,
+            allow_pickle: bool = False) -> dict:
+    """Run one transform job, reporting failures instead of raising"""
+    start = time.perf_counter()
+    result = {'input_path': job['dlc_path'], 'calibration_path': job['calibration_path'],
+              'output_path': job['output_path'], 'status': 'ok', 'rows': 0, 'masked_points': 0, 'error': ''}
+    try:
+        output_dir = os.path.dirname(job['output_path'])
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        calibration = cached_calibration(job['calibration_path'], allow_pickle)
+        summary = transform_dlc(job['dlc_path'], job['calibration_path'], job['output_path'],
+                                likelihood_threshold=likelihood_threshold, chunk_size=chunk_size,
+                                calibration=calibration)
+        result['rows'] = summary['rows']
+        result['masked_points'] = summary['masked_points']
+    except Exception as e:
+        result['status'] = 'failed'
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def run_parallel(function: Callable[..., dict], tasks: Sequence[tuple], workers: int = None,
+                 describe: Callable[[dict], str] = str) -> List[dict]:
+    """Call ``function(*task)`` for every task on a process pool, printing progress as they finish
+
+    ``describe`` turns a result into the progress line after the counter.
+    Results are returned in task order.
+    """
+    results = [None] * len(tasks)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(function, *task): n for n, task in enumerate(tasks)}
+        for i, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            results[futures[future]] = result
+            print(f"[{i}/{len(tasks)}] {describe(result)}", flush=True)
+    return results
+
+
+def _describe_job(result: dict) -> str:
+    if result['status'] == 'ok':
+        return f"OK     {result['input_path']} ({result['rows']} frames, {result['seconds']:.1f}s)"
+    return f"FAILED {result['input_path']}: {result['error']}"
+
+
+def run_batch(jobs: List[Dict[str, str]], workers: int = None, likelihood_threshold: float = 0.6,
+              chunk_size: int = 100000, allow_pickle: bool = False) -> List[dict]:
+    """Run transform jobs on a process pool, printing progress as they finish"""
+    tasks = [(job, likelihood_threshold, chunk_size, allow_pickle) for job in jobs]
+    return run_parallel(run_job, tasks, workers, _describe_job)
+
+
+def write_report(results: List[dict], report_path: str, fields: List[str] = REPORT_FIELDS):
+    """Write the per-file summary as CSV or JSON"""
+    if report_path.lower().endswith('.json'):
+        with open(report_path, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        with open(report_path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fields, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply calibrations to many DeepLabCut files without the GUI")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--manifest', help="CSV/JSON with dlc_path, calibration_path[, output_path] entries")
+    source.add_argument('--glob', help="Glob pattern of DLC files sharing one calibration (quote it)")
+    parser.add_argument('--calibration', help="Calibration file used with --glob")
+    parser.add_argument('--output-dir', help="Directory for outputs with --glob (default: next to inputs)")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="Number of worker processes (default: number of CPUs)")
+    parser.add_argument('--likelihood', type=float, default=0.6,
+                        help="Points below this likelihood are written as NaN (default: 0.6)")
+    parser.add_argument('--chunk-size', type=int, default=100000,
+                        help="Rows processed per chunk (default: 100000)")
+    parser.add_argument('--allow-pickle', action='store_true',
+                        help="Allow reading legacy .pkl calibrations (only from trusted sources)")
+    parser.add_argument('--report', default='batch_report.csv',
+                        help="Per-file summary report, .csv or .json (default: batch_report.csv)")
+    args = parser.parse_args()
+
+    if args.manifest:
+        jobs = read_manifest(args.manifest)
+    else:
+        if not args.calibration:
+            parser.error("--glob requires --calibration")
+        jobs = glob_jobs(args.glob, args.calibration, args.output_dir)
+    if not jobs:
+        print("No input files found")
+        return
+
+    print(f"Processing {len(jobs)} files with {args.workers or os.cpu_count()} workers")
+    start = time.perf_counter()
+    results = run_batch(jobs, args.workers, args.likelihood, args.chunk_size, args.allow_pickle)
+    write_report(results, args.report)
+    failed = sum(r['status'] != 'ok' for r in results)
+    print(f"\nBatch finished in {time.perf_counter() - start:.1f}s: "
+          f"{len(results) - failed} succeeded, {failed} failed")
+    print(f"Report saved to: {args.report}")
+
+
+if __name__ == "__main__":
+    main()
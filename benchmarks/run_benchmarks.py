@@ -0,0 +1,306 @@
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import cv2
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from calibration_io import load_calibration  # noqa: E402
+from calibration_tool import InteractiveCalibrationTool  # noqa: E402
+from dlc_data import cache_paths, read_dlc_file  # noqa: E402
+from frame_suggestions import farthest_point_order  # noqa: E402
+from geometry import apply_homography  # noqa: E402
+from seek_index import SeekIndex, sidecar_path  # noqa: E402
+from transform import transform_dlc  # noqa: E402
+from synthetic import make_dataset, parse_resolution, read_frame_code  # noqa: E402
+
+BENCHMARK_NAMES = ('load_csv', 'get_dlc_coordinate', 'seek', 'draw', 'homography', 'transform')
+
+
+def quiet(fn: Callable, *args, **kwargs):
+    """Call ``fn`` with its console output discarded"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+def measure(fn: Callable, repeat: int, setup: Optional[Callable] = None, per: int = 1) -> dict:
+    """Wall-clock statistics of ``repeat`` runs, in milliseconds per ``per`` operations"""
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000.0 / per)
+    times = np.array(times)
+    return {'unit': 'ms' if per == 1 else f'ms/op ({per} ops)', 'repeat': repeat,
+            'min': float(times.min()), 'median': float(np.median(times)),
+            'mean': float(times.mean()), 'max': float(times.max())}
+
+
+def grid_error(H: np.ndarray, H_true: np.ndarray, world_range=(0.0, 75.0), step: float = 5.0) -> dict:
+    """World distance between a fitted and the true mapping over an arena grid"""
+    ticks = np.arange(world_range[0], world_range[1] + step / 2, step)
+    grid = np.stack(np.meshgrid(ticks, ticks), axis=-1).reshape(-1, 2)
+    pixel = apply_homography(np.linalg.inv(H_true), grid)
+    error = np.linalg.norm(apply_homography(H, pixel) - grid, axis=1)
+    return {'mean': float(error.mean()), 'max': float(error.max())}
+
+
+def make_tool(dataset: dict, with_video: bool = True) -> InteractiveCalibrationTool:
+    tool = InteractiveCalibrationTool()
+    quiet(tool.load_csv, dataset['csv_path'])
+    tool.selected_bodypart_index = 0
+    tool.selected_bodypart = tool.bodyparts[0]
+    tool.selected_individual_index = 0
+    tool.selected_individual = tool.individuals[0]
+    if with_video and dataset['video_path']:
+        quiet(tool.load_video, dataset['video_path'])
+    return tool
+
+
+def calibration_points(tool: InteractiveCalibrationTool, world: np.ndarray, count: int) -> list:
+    """Calibration points spread over the arena, as an operator would pick them
+
+    Pixel coordinates come from the (noisy) DLC file, world coordinates
+    from the ground truth, like a user reading positions off the arena.
+    """
+    coords = tool.dlc_coords[:, 0, 0]
+    usable = np.flatnonzero(coords[:, 2] >= 0.9)
+    order = farthest_point_order(world[usable, 0, 0], count, start=0)
+    frames = usable[order]
+    return [((float(world[f, 0, 0, 0]), float(world[f, 0, 0, 1])),
+             (float(coords[f, 0]), float(coords[f, 1])), int(f)) for f in frames]
+
+
+def bench_load_csv(dataset: dict, repeat: int, results: dict):
+    csv_path = dataset['csv_path']
+
+    def clear_cache():
+        for path in cache_paths(csv_path):
+            if os.path.exists(path):
+                os.remove(path)
+    results['load_csv_cold'] = measure(lambda: quiet(InteractiveCalibrationTool().load_csv, csv_path),
+                                       repeat, setup=clear_cache)
+    results['load_csv_cached'] = measure(lambda: quiet(InteractiveCalibrationTool().load_csv, csv_path), repeat)
+
+
+def bench_get_dlc_coordinate(dataset: dict, repeat: int, results: dict):
+    tool = make_tool(dataset, with_video=False)
+    frames = len(tool.dlc_coords)
+
+    def run():
+        for frame_num in range(frames):
+            tool.get_dlc_coordinate(frame_num)
+    results['get_dlc_coordinate'] = measure(run, repeat, per=frames)
+
+
+def bench_seek(dataset: dict, repeat: int, results: dict, accuracy: dict, seed: int):
+    video_path = dataset['video_path']
+    sidecar = sidecar_path(video_path)
+
+    def remove_sidecar():
+        if os.path.exists(sidecar):
+            os.remove(sidecar)
+    results['seek_index_build'] = measure(lambda: quiet(SeekIndex.load_or_build, video_path), repeat,
+                                          setup=remove_sidecar)
+    index = quiet(SeekIndex.load_or_build, video_path)
+    accuracy['keyframe_interval'] = float(np.median(np.diff(index.keyframes))) if len(index.keyframes) > 1 else None
+    rng = np.random.default_rng(seed)
+    frames = index.frame_count
+    count = min(50, frames)
+    checked = []
+
+    def fresh_tool():
+        # A new tool per run so every run starts with an empty frame cache
+        if 'tool' in state:
+            state['tool'].frame_source.close()
+        state['tool'] = make_tool(dataset)
+
+    def play():
+        tool = state['tool']
+        for frame_num in range(count):
+            tool.frame_source.get(frame_num)
+
+    def random_seek():
+        tool = state['tool']
+        for frame_num in state['targets']:
+            frame = tool.frame_source.get(int(frame_num))
+            checked.append(frame is not None and read_frame_code(frame) == frame_num)
+
+    def new_targets():
+        fresh_tool()
+        state['targets'] = rng.choice(frames, count, replace=False)
+
+    state = {}
+    try:
+        results['play_sequential'] = measure(play, repeat, setup=fresh_tool, per=count)
+        results['seek_random'] = measure(random_seek, repeat, setup=new_targets, per=count)
+    finally:
+        if 'tool' in state:
+            state['tool'].frame_source.close()
+    accuracy['seek_exact_fraction'] = float(np.mean(checked)) if checked else None
+
+
+def bench_draw(dataset: dict, repeat: int, results: dict, world: np.ndarray):
+    tool = make_tool(dataset)
+    try:
+        tool.calibration_points = calibration_points(tool, world, 10)
+        quiet(tool.fit_calibration, n_boot=50)
+        frame = tool.frame_source.get(0)
+        count = 100
+
+        def run():
+            for frame_num in range(count):
+                tool.current_frame = frame_num
+                tool.draw_calibration_info(tool.get_display_frame(frame))
+
+        def paused():
+            for _ in range(count):
+                tool.draw_calibration_info(tool.get_display_frame(frame))
+        results['draw_playing'] = measure(run, repeat, per=count)
+        results['draw_paused'] = measure(paused, repeat, per=count)
+    finally:
+        tool.frame_source.close()
+
+
+def bench_homography(dataset: dict, repeat: int, results: dict, accuracy: dict, world: np.ndarray,
+                     workdir: str) -> str:
+    tool = make_tool(dataset, with_video=False)
+    tool.frame_size = tuple(dataset['resolution'])
+    H_true = np.array(dataset['homography'])
+    for count in (4, 8, 15):
+        tool.calibration_points = calibration_points(tool, world, count)
+        results[f'calculate_homography_{count}pts'] = measure(lambda: quiet(tool.calculate_homography), repeat)
+        H = quiet(tool.calculate_homography)
+        accuracy[f'homography_{count}pts_grid_error'] = grid_error(H, H_true, dataset['world_range'])
+    calibration_path = os.path.join(workdir, 'calibration.npz')
+    quiet(tool.save_calibration_data, calibration_path, H)
+    return calibration_path
+
+
+def bench_transform(dataset: dict, repeat: int, results: dict, accuracy: dict, world: np.ndarray,
+                    calibration_path: str, workdir: str):
+    output_path = os.path.join(workdir, 'synthetic_world.csv')
+    calibration = load_calibration(calibration_path)
+    results['transform_csv'] = measure(
+        lambda: transform_dlc(dataset['csv_path'], calibration_path, output_path, calibration=calibration), repeat)
+    coords = read_dlc_file(dataset['csv_path'], use_cache=False)[0]
+    results['pixel_to_world_points'] = measure(lambda: calibration.pixel_to_world(coords[..., :2]), repeat,
+                                               per=coords[..., 0].size)
+    converted = read_dlc_file(output_path, use_cache=False)[0]
+    error = np.linalg.norm(converted[..., :2] - world, axis=-1)
+    error = error[np.isfinite(error)]
+    accuracy['transform_world_error'] = {'mean': float(error.mean()), 'p95': float(np.quantile(error, 0.95)),
+                                         'points': int(error.size)}
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(dataset: dict, workdir: str, repeat: int = 5, only: Optional[List[str]] = None,
+                   seed: int = 0) -> dict:
+    """Run the selected benchmarks on a generated dataset and return the report"""
+    selected = set(only or BENCHMARK_NAMES)
+    results: Dict[str, dict] = {}
+    accuracy: Dict[str, object] = {}
+    world = np.load(dataset['world_path'])
+    if 'load_csv' in selected:
+        bench_load_csv(dataset, repeat, results)
+    if 'get_dlc_coordinate' in selected:
+        bench_get_dlc_coordinate(dataset, repeat, results)
+    if 'seek' in selected and dataset['video_path']:
+        bench_seek(dataset, repeat, results, accuracy, seed)
+    if 'draw' in selected and dataset['video_path']:
+        bench_draw(dataset, repeat, results, world)
+    if 'homography' in selected or 'transform' in selected:
+        calibration_path = bench_homography(dataset, repeat if 'homography' in selected else 1,
+                                            results, accuracy, world, workdir)
+        if 'transform' in selected:
+            bench_transform(dataset, repeat, results, accuracy, world, calibration_path, workdir)
+    return {
+        'metadata': {
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'opencv': cv2.__version__,
+            'platform': platform.platform(),
+            'processor': platform.processor() or platform.machine(),
+            'cpu_count': os.cpu_count(),
+        },
+        'dataset': {key: value for key, value in dataset.items() if not key.endswith('_path')},
+        'results': results,
+        'accuracy': accuracy,
+    }
+
+
+def compare(report: dict, baseline: dict):
+    """Print median timings of ``report`` next to those of ``baseline``"""
+    print(f"\n{'Benchmark':28s} {'baseline':>12s} {'current':>12s} {'ratio':>8s}")
+    for name, stats in report['results'].items():
+        old = baseline.get('results', {}).get(name)
+        if old is None:
+            print(f"{name:28s} {'-':>12s} {stats['median']:12.4g} {'-':>8s}")
+            continue
+        ratio = stats['median'] / old['median'] if old['median'] else float('nan')
+        print(f"{name:28s} {old['median']:12.4g} {stats['median']:12.4g} {ratio:7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the calibration tool on synthetic data")
+    parser.add_argument('--resolution', type=parse_resolution, default=(1280, 720), help="WIDTHxHEIGHT")
+    parser.add_argument('--frames', type=int, default=600)
+    parser.add_argument('--fps', type=float, default=30.0)
+    parser.add_argument('--gop', type=int, default=30, help="Keyframe interval requested from the encoder")
+    parser.add_argument('--individuals', type=int, default=1)
+    parser.add_argument('--bodyparts', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per benchmark (default: 5)")
+    parser.add_argument('--only', nargs='+', choices=BENCHMARK_NAMES, help="Run only these benchmarks")
+    parser.add_argument('--workdir', help="Keep the generated data in this directory")
+    parser.add_argument('-o', '--output', help="Write the report to this JSON file")
+    parser.add_argument('--compare', help="Baseline JSON report to compare against")
+    args = parser.parse_args()
+    workdir = args.workdir or tempfile.mkdtemp(prefix='dlc_bench_')
+    try:
+        print(f"Generating {args.resolution[0]}x{args.resolution[1]} dataset with {args.frames} frames...")
+        need_video = args.only is None or bool({'seek', 'draw'} & set(args.only))
+        dataset = make_dataset(workdir, args.resolution, args.frames, args.fps, args.gop, args.individuals,
+                               args.bodyparts, seed=args.seed, video=need_video)
+        report = run_benchmarks(dataset, workdir, args.repeat, args.only, args.seed)
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+    for name, stats in report['results'].items():
+        print(f"{name:28s} median {stats['median']:10.4g} {stats['unit']}")
+    for name, value in report['accuracy'].items():
+        print(f"{name:28s} {value}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
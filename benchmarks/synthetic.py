@@ -0,0 +1,217 @@
+import argparse
+import json
+import os
+import sys
+import cv2
+import numpy as np
+import pandas as pd
+from typing import Optional, Sequence, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from geometry import apply_homography  # noqa: E402
+
+WORLD_RANGE = (0.0, 75.0)
+FRAME_CODE_BITS = 20
+FRAME_CODE_CELL = 8
+
+
+def ground_truth_homography(image_size: Tuple[int, int], seed: int = 0,
+                            world_range: Tuple[float, float] = WORLD_RANGE) -> np.ndarray:
+    """Pixel-to-world homography of an arena seen by a slightly tilted camera
+
+    The arena square is mapped to a trapezoid that fills most of the
+    image, with seeded jitter on the corners so datasets differ.
+    """
+    width, height = image_size
+    rng = np.random.default_rng(seed)
+    lo, hi = world_range
+    # Far edge (top of the image) narrower than the near edge
+    quad = np.array([[0.22 * width, 0.12 * height], [0.78 * width, 0.12 * height],
+                     [0.90 * width, 0.88 * height], [0.10 * width, 0.88 * height]])
+    quad += rng.uniform(-0.02, 0.02, quad.shape) * [width, height]
+    world = np.array([[lo, lo], [hi, lo], [hi, hi], [lo, hi]])
+    return cv2.getPerspectiveTransform(quad.astype(np.float32), world.astype(np.float32))
+
+
+def world_trajectories(frames: int, individuals: int, bodyparts: int, seed: int = 0,
+                       world_range: Tuple[float, float] = WORLD_RANGE) -> np.ndarray:
+    """Smooth world tracks of shape (frames, individuals, bodyparts, 2)
+
+    Each individual's centre follows a sum of slow sinusoids, and its
+    bodyparts sit at fixed offsets around it, rotating with its heading.
+    """
+    rng = np.random.default_rng(seed)
+    lo, hi = world_range
+    t = np.arange(frames, dtype=np.float64)[:, None]
+    tracks = np.empty((frames, individuals, bodyparts, 2))
+    for i in range(individuals):
+        periods = rng.uniform(150, 900, (2, 3))
+        phases = rng.uniform(0, 2 * np.pi, (2, 3))
+        weights = rng.dirichlet(np.ones(3), 2)
+        centre = np.stack([np.sum(weights[k] * np.sin(2 * np.pi * t / periods[k] + phases[k]), axis=1)
+                           for k in range(2)], axis=1)
+        centre = (lo + hi) / 2 + centre * (hi - lo) * 0.4
+        velocity = np.gradient(centre, axis=0)
+        heading = np.arctan2(velocity[:, 1], velocity[:, 0])
+        radius = rng.uniform(0.5, 3.0, bodyparts)
+        angle = np.linspace(0, 2 * np.pi, bodyparts, endpoint=False)
+        direction = heading[:, None] + angle
+        offset = radius[:, None] * np.stack([np.cos(direction), np.sin(direction)], axis=-1)
+        tracks[:, i] = np.clip(centre[:, None, :] + offset, lo, hi)
+    return tracks
+
+
+def write_dlc_csv(path: str, pixel: np.ndarray, likelihood: np.ndarray, bodyparts: Sequence[str],
+                  individuals: Optional[Sequence[str]] = None, scorer: str = 'DLC_synthetic'):
+    """Write (frames, individuals, bodyparts, 2) pixel tracks as a DeepLabCut CSV
+
+    Uses the multi-animal header when there is more than one individual.
+    """
+    frames = len(pixel)
+    values = np.concatenate([pixel, likelihood[..., None]], axis=-1).reshape(frames, -1)
+    if individuals is not None and len(individuals) > 1:
+        columns = pd.MultiIndex.from_product([[scorer], individuals, bodyparts, ['x', 'y', 'likelihood']],
+                                             names=['scorer', 'individuals', 'bodyparts', 'coords'])
+    else:
+        columns = pd.MultiIndex.from_product([[scorer], bodyparts, ['x', 'y', 'likelihood']],
+                                             names=['scorer', 'bodyparts', 'coords'])
+    pd.DataFrame(values, columns=columns).to_csv(path)
+
+
+def draw_frame_code(frame: np.ndarray, frame_num: int):
+    """Stamp the frame number as a row of black/white cells in the top-left corner"""
+    for bit in range(FRAME_CODE_BITS):
+        value = 255 if (frame_num >> bit) & 1 else 0
+        x = bit * FRAME_CODE_CELL
+        frame[:FRAME_CODE_CELL, x:x + FRAME_CODE_CELL] = value
+
+
+def read_frame_code(frame: np.ndarray) -> int:
+    """Frame number stamped by draw_frame_code"""
+    cells = frame[:FRAME_CODE_CELL, :FRAME_CODE_BITS * FRAME_CODE_CELL]
+    # Read the centre of every cell, away from compression artefacts at the edges
+    margin = FRAME_CODE_CELL // 4
+    means = cells[margin:-margin].reshape(FRAME_CODE_CELL - 2 * margin, FRAME_CODE_BITS, FRAME_CODE_CELL, -1)
+    bits = means[:, :, margin:-margin].mean(axis=(0, 2, 3)) > 127
+    return int(np.sum(bits.astype(np.int64) << np.arange(FRAME_CODE_BITS)))
+
+
+def write_video(path: str, pixel: np.ndarray, H: np.ndarray, image_size: Tuple[int, int],
+                fps: float = 30.0, gop: int = 30, seed: int = 0):
+    """Render the tracks over a textured arena and encode them
+
+    ``gop`` is passed to the encoder as the keyframe interval; OpenCV builds
+    that ignore it keep their default, so callers should measure the
+    actual interval with a SeekIndex. A ``gop`` of 1 writes MJPG, where
+    every frame is a keyframe.
+    """
+    width, height = image_size
+    rng = np.random.default_rng(seed)
+    background = cv2.GaussianBlur(rng.integers(40, 120, (height, width, 3), dtype=np.uint8), (0, 0), 3)
+    lo, hi = WORLD_RANGE
+    H_inv = np.linalg.inv(H)
+    for value in np.arange(lo, hi + 1, 5.0):
+        for segment in ([[value, lo], [value, hi]], [[lo, value], [hi, value]]):
+            a, b = np.round(apply_homography(H_inv, np.array(segment))).astype(int)
+            cv2.line(background, tuple(a), tuple(b), (170, 170, 170), 1, cv2.LINE_AA)
+    colors = [tuple(int(c) for c in rng.integers(60, 256, 3)) for _ in range(pixel.shape[1] * pixel.shape[2])]
+    radius = max(int(round(min(width, height) / 150)), 2)
+    if gop <= 1:
+        fourcc = cv2.VideoWriter_fourcc(*'MJPG')
+        path = os.path.splitext(path)[0] + '.avi'
+    else:
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+    writer = cv2.VideoWriter(path, cv2.CAP_FFMPEG, fourcc, fps, (width, height),
+                             [cv2.VIDEOWRITER_PROP_KEY_INTERVAL, max(int(gop), 1)])
+    if not writer.isOpened():
+        raise IOError(f"Cannot create video: {path}")
+    frame = np.empty_like(background)
+    points = np.round(pixel.reshape(len(pixel), -1, 2)).astype(int)
+    try:
+        for frame_num in range(len(pixel)):
+            np.copyto(frame, background)
+            for j, (x, y) in enumerate(points[frame_num]):
+                cv2.circle(frame, (x, y), radius, colors[j], -1, cv2.LINE_AA)
+            draw_frame_code(frame, frame_num)
+            writer.write(frame)
+    finally:
+        writer.release()
+    return path
+
+
+def make_dataset(directory: str, image_size: Tuple[int, int] = (1280, 720), frames: int = 600,
+                 fps: float = 30.0, gop: int = 30, individuals: int = 1, bodyparts: int = 4,
+                 noise_px: float = 0.5, dropout: float = 0.02, seed: int = 0, video: bool = True) -> dict:
+    """Generate a video, a matching DLC CSV and their ground truth in ``directory``
+
+    Returns the dataset description that is also written to
+    ground_truth.json; the exact world tracks are saved to
+    ground_truth_world.npy.
+    """
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(seed + 1)
+    H = ground_truth_homography(image_size, seed)
+    world = world_trajectories(frames, individuals, bodyparts, seed)
+    pixel = apply_homography(np.linalg.inv(H), world)
+    observed = pixel + rng.normal(0.0, noise_px, pixel.shape)
+    likelihood = rng.uniform(0.9, 1.0, pixel.shape[:-1])
+    # Tracking failures: low likelihood and a position far from the truth
+    failed = rng.random(pixel.shape[:-1]) < dropout
+    likelihood[failed] = rng.uniform(0.0, 0.3, failed.sum())
+    observed[failed] += rng.normal(0.0, 40.0, (failed.sum(), 2))
+    bodypart_names = [f"bp{k}" for k in range(bodyparts)]
+    individual_names = [f"animal{i}" for i in range(individuals)] if individuals > 1 else None
+    csv_path = os.path.join(directory, 'synthetic_dlc.csv')
+    write_dlc_csv(csv_path, observed, likelihood, bodypart_names, individual_names)
+    video_path = None
+    if video:
+        video_path = write_video(os.path.join(directory, 'synthetic_video.mp4'), pixel, H, image_size,
+                                 fps, gop, seed)
+    np.save(os.path.join(directory, 'ground_truth_world.npy'), world)
+    dataset = {
+        'video_path': video_path,
+        'csv_path': csv_path,
+        'world_path': os.path.join(directory, 'ground_truth_world.npy'),
+        'homography': H.tolist(),
+        'world_range': list(WORLD_RANGE),
+        'resolution': list(image_size),
+        'frames': frames,
+        'fps': fps,
+        'gop': gop,
+        'individuals': individual_names or [''],
+        'bodyparts': bodypart_names,
+        'noise_px': noise_px,
+        'dropout': dropout,
+        'seed': seed,
+    }
+    with open(os.path.join(directory, 'ground_truth.json'), 'w') as f:
+        json.dump(dataset, f, indent=2)
+    return dataset
+
+
+def parse_resolution(text: str) -> Tuple[int, int]:
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic video and DLC CSV with known ground truth")
+    parser.add_argument('directory', help="Output directory")
+    parser.add_argument('--resolution', type=parse_resolution, default=(1280, 720), help="WIDTHxHEIGHT")
+    parser.add_argument('--frames', type=int, default=600)
+    parser.add_argument('--fps', type=float, default=30.0)
+    parser.add_argument('--gop', type=int, default=30, help="Keyframe interval requested from the encoder")
+    parser.add_argument('--individuals', type=int, default=1)
+    parser.add_argument('--bodyparts', type=int, default=4)
+    parser.add_argument('--noise', type=float, default=0.5, help="DLC pixel noise standard deviation")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    dataset = make_dataset(args.directory, args.resolution, args.frames, args.fps, args.gop,
+                           args.individuals, args.bodyparts, args.noise, seed=args.seed)
+    print(f"Video: {dataset['video_path']}")
+    print(f"DLC CSV: {dataset['csv_path']}")
+    print(f"Ground truth: {os.path.join(args.directory, 'ground_truth.json')}")
+
+
+if __name__ == "__main__":
+    main()
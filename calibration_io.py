@@ -0,0 +1,159 @@
+import json
+import pickle
+import zipfile
+import numpy as np
+from typing import Optional
+from geometry import apply_homography
+from drift import ReferenceFeatures
+from lens_model import DivisionDistortion, PixelLookupTable
+
+CALIBRATION_FORMAT = 'DLCCoordMapper calibration'
+# Version 2 adds lens distortion and the dense lookup table, version 3 a
+# camera drift correction. Files are written with the lowest version that
+# holds their content so older readers can load them; the optional
+# reference features need no new version because ignoring them is safe
+CALIBRATION_VERSION = 3
+# Header keys owned by save_calibration, dropped from copied metadata
+_RESERVED_KEYS = ('distortion', 'lut_step', 'reference', 'drift')
+
+
+class CalibrationTransformer:
+    """Loaded calibration that converts whole arrays between pixel and world coordinates
+
+    With lens distortion, ``H`` maps undistorted pixels to world
+    coordinates and pixel_to_world reads the precomputed lookup table.
+    With a ``drift`` homography (a camera that moved after calibration),
+    pixels of the current video are first mapped to the pixels of the
+    video the calibration was made on.
+    """
+
+    def __init__(self, H: np.ndarray, H_inv: Optional[np.ndarray] = None,
+                 pixel_points: Optional[np.ndarray] = None, world_points: Optional[np.ndarray] = None,
+                 frames: Optional[np.ndarray] = None, errors: Optional[np.ndarray] = None,
+                 metadata: Optional[dict] = None, distortion: Optional[DivisionDistortion] = None,
+                 lookup_table: Optional[PixelLookupTable] = None,
+                 reference: Optional[ReferenceFeatures] = None, drift: Optional[np.ndarray] = None):
+        self.H = np.asarray(H, dtype=np.float64)
+        self.H_inv = np.linalg.inv(self.H) if H_inv is None else np.asarray(H_inv, dtype=np.float64)
+        self.pixel_points = np.empty((0, 2)) if pixel_points is None else pixel_points
+        self.world_points = np.empty((0, 2)) if world_points is None else world_points
+        self.frames = np.empty(0, dtype=np.int64) if frames is None else frames
+        self.errors = np.empty(0) if errors is None else errors
+        self.metadata = metadata or {}
+        self.distortion = distortion
+        self.lookup_table = lookup_table
+        self.reference = reference
+        self.drift = None if drift is None else np.asarray(drift, dtype=np.float64)
+
+    def pixel_to_world(self, points: np.ndarray) -> np.ndarray:
+        """Convert an (..., 2) array of pixel coordinates to world coordinates"""
+        if self.drift is not None:
+            points = apply_homography(self.drift, points)
+        if self.lookup_table is not None:
+            return self.lookup_table.lookup(points)
+        if self.distortion is not None:
+            points = self.distortion.undistort(points)
+        return apply_homography(self.H, points)
+
+    def world_to_pixel(self, points: np.ndarray) -> np.ndarray:
+        """Convert an (..., 2) array of world coordinates to pixel coordinates"""
+        pixel = apply_homography(self.H_inv, points)
+        if self.distortion is not None:
+            pixel = self.distortion.distort(pixel)
+        if self.drift is not None:
+            pixel = apply_homography(np.linalg.inv(self.drift), pixel)
+        return pixel
+
+
+def save_calibration(filename: str, H: np.ndarray, pixel_points: np.ndarray, world_points: np.ndarray,
+                     frames: np.ndarray, metadata: Optional[dict] = None,
+                     distortion: Optional[DivisionDistortion] = None, lut_step: int = 4,
+                     reference: Optional[ReferenceFeatures] = None, drift: Optional[np.ndarray] = None):
+    """Write a calibration as a JSON header plus binary arrays (.npz container)
+
+    With ``distortion`` the combined undistort + homography mapping is
+    baked into a float32 lookup table over the whole image and stored too.
+    ``reference`` stores background features for drift checks, and
+    ``drift`` a homography from the current video's pixels to those of
+    the calibration video.
+    """
+    H = np.asarray(H, dtype=np.float64)
+    pixel_points = np.asarray(pixel_points, dtype=np.float64).reshape(-1, 2)
+    world_points = np.asarray(world_points, dtype=np.float64).reshape(-1, 2)
+    undistorted = distortion.undistort(pixel_points) if distortion is not None else pixel_points
+    errors = np.linalg.norm(apply_homography(H, undistorted) - world_points, axis=1)
+    header = {key: value for key, value in (metadata or {}).items() if key not in _RESERVED_KEYS}
+    header.update({
+        'format': CALIBRATION_FORMAT,
+        'format_version': 1,
+        'num_points': len(pixel_points),
+        'mean_error': float(errors.mean()) if len(errors) else None,
+        'max_error': float(errors.max()) if len(errors) else None,
+    })
+    arrays = {}
+    if distortion is not None:
+        lookup_table = PixelLookupTable.build(H, distortion.image_size, distortion, lut_step)
+        header.update({'format_version': 2, 'distortion': distortion.to_dict(), 'lut_step': lookup_table.step})
+        arrays['lut'] = lookup_table.table
+    if reference is not None:
+        header['reference'] = reference.to_header()
+        arrays['reference_keypoints'] = reference.keypoints
+        arrays['reference_descriptors'] = reference.descriptors
+    if drift is not None:
+        header.update({'format_version': 3, 'drift': True})
+        arrays['drift'] = np.asarray(drift, dtype=np.float64)
+    header_bytes = np.frombuffer(json.dumps(header).encode('utf-8'), dtype=np.uint8)
+    # Passing a file object stops numpy from appending .npz to the name
+    with open(filename, 'wb') as f:
+        np.savez(f, header=header_bytes, H=H, H_inv=np.linalg.inv(H), pixel_points=pixel_points,
+                 world_points=world_points, frames=np.asarray(frames, dtype=np.int64), errors=errors,
+                 **arrays)
+
+
+def _load_legacy_pickle(filename: str) -> CalibrationTransformer:
+    with open(filename, 'rb') as f:
+        data = pickle.load(f)
+    if data.get('homography_matrix') is None:
+        raise ValueError(f"No homography matrix in calibration file: {filename}")
+    points = data.get('calibration_points', [])
+    metadata = {key: data.get(key) for key in ('video_path', 'csv_path', 'selected_bodypart', 'fps')}
+    metadata['format_version'] = 0
+    return CalibrationTransformer(
+        np.array(data['homography_matrix'], dtype=np.float64),
+        pixel_points=np.array([p[1] for p in points], dtype=np.float64).reshape(-1, 2),
+        world_points=np.array([p[0] for p in points], dtype=np.float64).reshape(-1, 2),
+        frames=np.array([p[2] for p in points], dtype=np.int64),
+        metadata=metadata)
+
+
+def load_calibration(filename: str, allow_pickle: bool = False) -> CalibrationTransformer:
+    """Load a saved calibration into a reusable transformer
+
+    Legacy pickle files (.pkl) are only read with ``allow_pickle=True``,
+    since unpickling a file from an untrusted source can run arbitrary code.
+    """
+    if not zipfile.is_zipfile(filename):
+        if not allow_pickle:
+            raise ValueError(f"{filename} is not a calibration file in the current format; "
+                             "pass allow_pickle=True to read a trusted legacy pickle file")
+        return _load_legacy_pickle(filename)
+    with np.load(filename, allow_pickle=False) as data:
+        header = json.loads(data['header'].tobytes().decode('utf-8'))
+        if header.get('format') != CALIBRATION_FORMAT:
+            raise ValueError(f"Not a calibration file: {filename}")
+        if header.get('format_version', 0) > CALIBRATION_VERSION:
+            raise ValueError(f"Calibration format version {header['format_version']} is newer than "
+                             f"supported version {CALIBRATION_VERSION}")
+        distortion = None
+        lookup_table = None
+        if header.get('distortion'):
+            distortion = DivisionDistortion.from_dict(header['distortion'])
+            lookup_table = PixelLookupTable(data['lut'], header['lut_step'])
+        reference = None
+        if header.get('reference'):
+            reference = ReferenceFeatures(data['reference_keypoints'], data['reference_descriptors'],
+                                          header['reference']['image_size'])
+        drift = data['drift'] if header.get('drift') else None
+        return CalibrationTransformer(data['H'], data['H_inv'], data['pixel_points'], data['world_points'],
+                                      data['frames'], data['errors'], header, distortion, lookup_table,
+                                      reference, drift)
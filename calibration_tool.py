@@ -1,41 +1,91 @@
 import cv2
 import numpy as np
-import pandas as pd
 import os
-import pickle
+import tkinter as tk
 from tkinter import messagebox
-from dialogs import CoordinateInputDialog, BodyPartSelectionDialog
+from dialogs import BodyPartSelectionDialog, CoordinateInputPanel
+from analytics import analyze_trajectories
+from calibration_io import CalibrationTransformer, save_calibration
+from diagnostics import compute_diagnostics
+from dlc_data import read_dlc_file
+from drift import build_reference
+from geometry import apply_homography
+from lens_model import estimate_distortion
+from overlay import OverlayCompositor, marker_sprite, text_sprite
+from playback import PlaybackClock
+from profiler import StageProfiler
+from frame_canvas import FrameCanvas
+from frame_source import DecodeWorker, FrameSource
+from frame_suggestions import suggest_calibration_frames
+from seek_index import SeekIndex
 from typing import Optional, Tuple
 
 class InteractiveCalibrationTool:
     def __init__(self):
         self.video_path = None
         self.csv_path = None
-        self.cap = None
+        self.frame_source = None
+        self.seek_index = None
         self.current_frame = 0
         self.total_frames = 0
         self.fps = 30
-        self.dlc_data = None
+        self.frame_size = (0, 0)
+        self.dlc_coords = None
+        self.scorer = None
         self.selected_bodypart = None
+        self.selected_bodypart_index = None
         self.bodyparts = []
+        self.individuals = []
+        self.selected_individual = None
+        self.selected_individual_index = None
         self.calibration_points = []
+        self.diagnostics = None
+        # Bumped whenever diagnostics change; part of the overlay cache keys
+        self._diagnostics_version = 0
+        self.distortion = None
+        self.suggested_frames = []
+        self.suggestion_index = -1
         self.window_name = "DeepLabCut Calibration Tool - Space: Pause, C: Add calibration point"
         self.current_frame_img = None
         self.root = None
-        self.inputting_coordinates = False
+        self.window = None
+        self.frame_canvas = None
+        self.input_panel = None
+        self.decoder = None
+        self.playing = False
+        self._target_frame = 0
+        self._awaiting_frame = False
+        self._ready_frame = None
+        self._after_id = None
+        self.playback_clock = None
+        self.max_display_size = (1600, 900)
+        self.display_scale = 1.0
+        self._display_proxy = None
+        self._display_proxy_frame = None
+        self._display_stages = []
+        # DLC_PROFILE=1 records stage timings from the start; F toggles the
+        # on-screen profiler. DLC_PROFILE_TRACE sets the .json/.csv trace path
+        self.profiler = StageProfiler(enabled=bool(os.environ.get('DLC_PROFILE')))
+        self.show_profiler = self.profiler.enabled
+        self.profile_trace_path = os.environ.get('DLC_PROFILE_TRACE')
+        self.overlay = OverlayCompositor()
+        self.overlay.add_layer('points', self._point_sprites)
+        self.overlay.add_layer('mode', self._mode_sprites)
+        self.overlay.add_layer('frame', self._frame_sprites)
+        self.overlay.add_layer('hud', self._hud_sprites)
 
     def load_csv(self, csv_path: str) -> bool:
-        """Load DeepLabCut CSV file"""
+        """Load DeepLabCut CSV or H5 file"""
         try:
             self.csv_path = csv_path
-            self.dlc_data = pd.read_csv(csv_path, header=[0, 1, 2])
-            self.bodyparts = list(self.dlc_data.columns.get_level_values(1).unique())
-            self.bodyparts = [bp for bp in self.bodyparts if bp and bp != 'coords']
+            self.dlc_coords, self.individuals, self.bodyparts, self.scorer = read_dlc_file(csv_path)
             
             print("CSV file loaded successfully:")
             print(f"  Path: {csv_path}")
-            print(f"  Number of rows: {len(self.dlc_data)}")
+            print(f"  Number of rows: {len(self.dlc_coords)}")
             print(f"  Body parts: {self.bodyparts}")
+            if len(self.individuals) > 1:
+                print(f"  Individuals: {self.individuals}")
             return True
         except Exception as e:
             print(f"Failed to load CSV file: {e}")
@@ -47,11 +97,16 @@ class InteractiveCalibrationTool:
             messagebox.showerror("Error", "No body part data found in CSV file", parent=root)
             return False
         
-        dialog = BodyPartSelectionDialog(root, self.bodyparts)
+        dialog = BodyPartSelectionDialog(root, self.bodyparts, self.individuals)
         root.wait_window(dialog.dialog)
         
         if dialog.result:
             self.selected_bodypart = dialog.result
+            self.selected_bodypart_index = self.bodyparts.index(dialog.result)
+            self.selected_individual = dialog.individual
+            self.selected_individual_index = self.individuals.index(dialog.individual)
+            if len(self.individuals) > 1:
+                print(f"Selected individual: {self.selected_individual}")
             print(f"Selected body part: {self.selected_bodypart}")
             return True
         else:
@@ -60,227 +115,495 @@ class InteractiveCalibrationTool:
     
     def get_dlc_coordinate(self, frame_num: int) -> Optional[Tuple[float, float, float]]:
         """Get DeepLabCut coordinates for a specific frame"""
-        if self.dlc_data is None or self.selected_bodypart is None:
+        if self.dlc_coords is None or self.selected_bodypart_index is None:
             return None
-        if frame_num >= len(self.dlc_data):
+        if not 0 <= frame_num < len(self.dlc_coords):
             return None
-        try:
-            scorer = self.dlc_data.columns.get_level_values(0)[0]
-            x = self.dlc_data.loc[frame_num, (scorer, self.selected_bodypart, 'x')]
-            y = self.dlc_data.loc[frame_num, (scorer, self.selected_bodypart, 'y')]
-            try:
-                likelihood = self.dlc_data.loc[frame_num, (scorer, self.selected_bodypart, 'likelihood')]
-                return (float(x), float(y), float(likelihood))
-            except:
-                return (float(x), float(y), 1.0)
-        except Exception as e:
-            print(f"Failed to get coordinates for frame {frame_num}: {e}")
+        with self.profiler.stage('dlc_lookup'):
+            x, y, likelihood = self.dlc_coords[frame_num, self.selected_individual_index, self.selected_bodypart_index]
+            return (float(x), float(y), float(likelihood))
+    
+    def get_dlc_coordinates(self, frame_slice: slice) -> Optional[np.ndarray]:
+        """Get DeepLabCut coordinates for a range of frames as an (n, 3) array"""
+        if self.dlc_coords is None or self.selected_bodypart_index is None:
+            return None
+        return self.dlc_coords[frame_slice, self.selected_individual_index, self.selected_bodypart_index]
+    
+    def get_all_individuals(self, frame_num: int) -> Optional[np.ndarray]:
+        """Get the selected body part of every individual as an (individuals, 3) array"""
+        if self.dlc_coords is None or self.selected_bodypart_index is None:
+            return None
+        if not 0 <= frame_num < len(self.dlc_coords):
             return None
+        return self.dlc_coords[frame_num, :, self.selected_bodypart_index]
     
     def load_video(self, video_path: str) -> bool:
         """Load video file"""
+        if self.frame_source is not None:
+            self.frame_source.close()
         self.video_path = video_path
-        self.cap = cv2.VideoCapture(video_path)
-        if not self.cap.isOpened():
+        self.seek_index = SeekIndex.load_or_build(video_path)
+        self.frame_source = FrameSource(video_path, seek_index=self.seek_index)
+        if not self.frame_source.is_opened():
             print(f"Cannot open video file: {video_path}")
             return False
-        self.total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.total_frames = self.frame_source.frame_count
+        self.fps = self.frame_source.fps
+        self.frame_size = self.frame_source.frame_size
+        self.playback_clock = PlaybackClock(self.seek_index.timestamps_ms if self.seek_index else None,
+                                            self.fps, self.total_frames)
+        self._display_proxy_frame = None
         print("Video loaded successfully:")
         print(f"  Total frames: {self.total_frames}")
         print(f"  FPS: {self.fps:.2f}")
+        if self.dlc_coords is not None and len(self.dlc_coords) != self.total_frames:
+            print(f"  Warning: CSV has {len(self.dlc_coords)} rows but video has {self.total_frames} frames")
+        return True
+    
+    def suggest_frames(self, num_frames: int = 12) -> list:
+        """Rank frames of the selected body part that are good calibration candidates"""
+        coords = self.get_dlc_coordinates(slice(0, self.total_frames or None))
+        if coords is None:
+            return []
+        self.suggested_frames = [int(f) for f in suggest_calibration_frames(coords, num_frames)]
+        self.suggestion_index = -1
+        if self.suggested_frames:
+            print(f"Suggested calibration frames: {self.suggested_frames}")
+        else:
+            print("No suitable calibration frames found (low likelihood or unsteady tracking)")
+        return self.suggested_frames
+    
+    def jump_to_suggestion(self, step: int) -> bool:
+        """Move to the next (step=1) or previous (step=-1) suggested frame"""
+        if not self.suggested_frames:
+            return False
+        self.suggestion_index = (self.suggestion_index + step) % len(self.suggested_frames)
+        self.current_frame = self.suggested_frames[self.suggestion_index]
+        print(f"Suggested frame {self.suggestion_index + 1}/{len(self.suggested_frames)}: {self.current_frame}")
         return True
     
     def add_calibration_point(self):
-        """Add the current frame as a calibration point"""
-        if self.inputting_coordinates:
+        """Open the non-modal coordinate panel for the displayed frame"""
+        if self.input_panel.is_open():
+            self.input_panel.x_entry.focus_set()
             return
-        self.inputting_coordinates = True
         dlc_coord = self.get_dlc_coordinate(self.current_frame)
-        if dlc_coord is None:
-            messagebox.showerror("Error", f"Cannot get DeepLabCut coordinates for frame {self.current_frame}", parent=self.root)
-            self.inputting_coordinates = False
+        if dlc_coord is None or not np.isfinite(dlc_coord[:2]).all():
+            messagebox.showerror("Error", f"Cannot get DeepLabCut coordinates for frame {self.current_frame}",
+                                 parent=self.window)
             return
-        if len(dlc_coord) > 2 and dlc_coord[2] < 0.5:
-            if not messagebox.askyesno("Low confidence warning", 
-                f"Frame {self.current_frame} has low confidence ({dlc_coord[2]:.3f}). Use anyway?", 
-                parent=self.root):
-                self.inputting_coordinates = False
-                return
-        dialog = CoordinateInputDialog(self.root, self.current_frame, dlc_coord)
-        self.root.wait_window(dialog.dialog)
-        if dialog.result is not None:
-            world_coord = dialog.result
-            pixel_coord = (dlc_coord[0], dlc_coord[1])
-            self.calibration_points.append((world_coord, pixel_coord, self.current_frame))
-            print(f"Added calibration point {len(self.calibration_points)}: "
-                  f"Frame {self.current_frame}, World ({world_coord[0]:.1f}, {world_coord[1]:.1f}) -> "
-                  f"Pixel ({pixel_coord[0]:.1f}, {pixel_coord[1]:.1f})")
-        else:
-            print("Cancelled adding calibration point")
-        self.inputting_coordinates = False
-    
-    def draw_calibration_info(self, frame):
-        """Draw calibration info on the frame"""
-        display_frame = frame.copy()
-        current_dlc_coord = self.get_dlc_coordinate(self.current_frame)
-        if current_dlc_coord:
-            x, y = int(current_dlc_coord[0]), int(current_dlc_coord[1])
-            cv2.circle(display_frame, (x, y), 8, (255, 255, 0), 2)
-            cv2.circle(display_frame, (x, y), 3, (255, 255, 0), -1)
-            coord_text = f"{self.selected_bodypart}: ({x}, {y})"
-            if len(current_dlc_coord) > 2:
-                coord_text += f" conf:{current_dlc_coord[2]:.3f}"
-            cv2.putText(display_frame, coord_text, (x+15, y-10), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 2)
+        self.input_panel.show(self.current_frame, dlc_coord, low_confidence=len(dlc_coord) > 2 and dlc_coord[2] < 0.5)
+        self._render()
+
+    def _confirm_point(self, frame_num, dlc_coord, world_coord):
+        pixel_coord = (dlc_coord[0], dlc_coord[1])
+        self.calibration_points.append((world_coord, pixel_coord, frame_num))
+        print(f"Added calibration point {len(self.calibration_points)}: "
+              f"Frame {frame_num}, World ({world_coord[0]:.1f}, {world_coord[1]:.1f}) -> "
+              f"Pixel ({pixel_coord[0]:.1f}, {pixel_coord[1]:.1f})")
+        self.update_diagnostics()
+        self.frame_canvas.canvas.focus_set()
+        self._render()
+
+    def _cancel_point(self):
+        print("Cancelled adding calibration point")
+        self.frame_canvas.canvas.focus_set()
+        self._render()
+
+    def _point_sprites(self, shape):
+        diagnostics = self.diagnostics
+        sprites = []
+        scale = self.display_scale
         for i, (world_coord, pixel_coord, frame_num) in enumerate(self.calibration_points):
-            x, y = int(pixel_coord[0]), int(pixel_coord[1])
+            x, y = int(pixel_coord[0] * scale), int(pixel_coord[1] * scale)
+            outlier = diagnostics is not None and not diagnostics['inliers'][i]
+            label = f"P{i+1}({world_coord[0]:.1f},{world_coord[1]:.1f})"
+            if diagnostics is not None:
+                label += f" err:{diagnostics['errors'][i]:.2f}" + (" OUTLIER" if outlier else "")
             if frame_num == self.current_frame:
-                color = (0, 255, 0)
-                cv2.circle(display_frame, (x, y), 10, color, 3)
+                sprites.append(marker_sprite((x, y), 10, 3, (0, 255, 0), label, (255, 255, 255)))
             else:
-                color = (0, 0, 255)
-                cv2.circle(display_frame, (x, y), 6, color, 2)
-            cv2.circle(display_frame, (x, y), 2, color, -1)
-            label = f"P{i+1}({world_coord[0]:.1f},{world_coord[1]:.1f})"
-            cv2.putText(display_frame, label, (x+12, y-8), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
-        if self.inputting_coordinates:
-            info_text = "Please input world coordinates in popup..."
+                color = (255, 0, 255) if outlier else (0, 0, 255)
+                sprites.append(marker_sprite((x, y), 6, 2, color, label, (255, 255, 255)))
+        return sprites
+
+    def _mode_sprites(self, shape):
+        if self.input_panel is not None and self.input_panel.is_open():
+            info_text = f"Enter world coordinates for frame {self.input_panel.frame_num} in the panel..."
             color = (0, 255, 255)
         else:
             info_text = f"Current body part: {self.selected_bodypart} ({len(self.calibration_points)} points added)"
             color = (0, 255, 0) if len(self.calibration_points) >= 4 else (0, 165, 255)
-        cv2.putText(display_frame, info_text, (10, 30), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+        return [text_sprite(info_text, (10, 30), 0.6, color, 2)]
+
+    def _frame_sprites(self, shape):
         frame_info = f"Frame: {self.current_frame}/{self.total_frames}"
-        cv2.putText(display_frame, frame_info, (10, display_frame.shape[0] - 100), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-        controls_info = "Space: Play/Pause | C: Add point | A/D: Step | R: Remove last | ESC: Exit"
-        cv2.putText(display_frame, controls_info, (10, display_frame.shape[0] - 80), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.4, (200, 200, 200), 1)
+        if self.playback_clock is not None and self.playback_clock.speed != 1.0:
+            frame_info += f" | Speed: {self.playback_clock.speed:g}x"
+        return [text_sprite(frame_info, (10, shape[0] - 100), 0.5, (255, 255, 255))]
+
+    def _hud_sprites(self, shape):
+        diagnostics = self.diagnostics
+        height = shape[0]
+        controls_info = ("Space: Play/Pause | C: Add point | A/D: Step | N/P: Suggested | +/-: Speed | "
+                         "R: Remove last | ESC: Exit")
         status_info = f"Calibration points: {len(self.calibration_points)}"
-        if len(self.calibration_points) >= 4:
+        if diagnostics is not None:
+            status_info += f" | mean err: {diagnostics['mean_error']:.2f}"
+            if np.isfinite(diagnostics['loo_max_error']):
+                status_info += f" | LOO max: {diagnostics['loo_max_error']:.2f}"
+            status_info += f" | grid 95%: {diagnostics['bootstrap']['max_upper']:.2f}"
+            status_color = (0, 255, 0) if diagnostics['mean_error'] <= 2.0 else (0, 0, 255)
+        elif len(self.calibration_points) >= 4:
             status_info += " (ready to compute matrix)"
             status_color = (0, 255, 0)
         else:
             status_info += " (need at least 4)"
             status_color = (0, 165, 255)
-        cv2.putText(display_frame, status_info, (10, display_frame.shape[0] - 60), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, status_color, 1)
         coordinate_info = "World coordinate range: (0,0) to (75,75)"
-        cv2.putText(display_frame, coordinate_info, (10, display_frame.shape[0] - 40), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.4, (200, 200, 200), 1)
         csv_info = f"CSV: {os.path.basename(self.csv_path) if self.csv_path else 'None'}"
-        cv2.putText(display_frame, csv_info, (10, display_frame.shape[0] - 20), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.4, (200, 200, 200), 1)
-        return display_frame
-    
-    def get_current_frame(self):
-        """Get current frame"""
-        self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.current_frame)
-        ret, frame = self.cap.read()
-        if ret:
-            self.current_frame_img = frame
+        return [text_sprite(controls_info, (10, height - 80), 0.4, (200, 200, 200)),
+                text_sprite(status_info, (10, height - 60), 0.5, status_color),
+                text_sprite(coordinate_info, (10, height - 40), 0.4, (200, 200, 200)),
+                text_sprite(csv_info, (10, height - 20), 0.4, (200, 200, 200))]
+
+    def get_display_frame(self, frame):
+        """Downscaled proxy of the frame that fits max_display_size, cached per frame number"""
+        height, width = frame.shape[:2]
+        max_width, max_height = self.max_display_size
+        self.display_scale = min(1.0, max_width / width, max_height / height)
+        if self.display_scale == 1.0:
             return frame
-        return None
+        size = (max(int(width * self.display_scale), 1), max(int(height * self.display_scale), 1))
+        proxy = self._display_proxy
+        if proxy is None or proxy.shape[1::-1] != size or proxy.shape[2:] != frame.shape[2:]:
+            proxy = self._display_proxy = np.empty((size[1], size[0]) + frame.shape[2:], dtype=frame.dtype)
+            self._display_stages = []
+        elif self._display_proxy_frame == self.current_frame:
+            return proxy
+        source = frame
+        level = 0
+        while source.shape[1] >= 2 * size[0] and source.shape[0] >= 2 * size[1]:
+            if level == len(self._display_stages):
+                half = (source.shape[0] // 2, source.shape[1] // 2) + source.shape[2:]
+                self._display_stages.append(np.empty(half, dtype=frame.dtype))
+            stage = self._display_stages[level]
+            cv2.resize(source[:stage.shape[0] * 2, :stage.shape[1] * 2], stage.shape[1::-1], dst=stage,
+                       interpolation=cv2.INTER_AREA)
+            source = stage
+            level += 1
+        cv2.resize(source, size, dst=proxy, interpolation=cv2.INTER_LINEAR)
+        self._display_proxy_frame = self.current_frame
+        return proxy
+
+    def draw_calibration_info(self, frame):
+        """Draw calibration info on a (possibly downscaled) frame into a reused buffer"""
+        scale = self.display_scale
+        profiler = self.profiler
+        with profiler.stage('draw_markers'):
+            display_frame = self._draw_markers(frame, scale)
+        with profiler.stage('draw_layers'):
+            self._draw_layers(display_frame, scale)
+        if self.show_profiler:
+            self._draw_profiler(display_frame)
+        return display_frame
+
+    def _draw_markers(self, frame, scale):
+        display_frame = self.overlay.begin(frame)
+        individuals = self.get_all_individuals(self.current_frame)
+        if individuals is not None and len(individuals) > 1:
+            visible = np.isfinite(individuals[:, :2]).all(axis=1)
+            visible[self.selected_individual_index] = False
+            for i in np.flatnonzero(visible):
+                x, y = (individuals[i, :2] * scale).astype(int)
+                cv2.circle(display_frame, (x, y), 6, (180, 180, 180), 1)
+                cv2.putText(display_frame, str(self.individuals[i]), (x+10, y-6),
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.4, (180, 180, 180), 1)
+        current_dlc_coord = self.get_dlc_coordinate(self.current_frame)
+        if current_dlc_coord and np.isfinite(current_dlc_coord[:2]).all():
+            x, y = int(current_dlc_coord[0] * scale), int(current_dlc_coord[1] * scale)
+            cv2.circle(display_frame, (x, y), 8, (255, 255, 0), 2)
+            cv2.circle(display_frame, (x, y), 3, (255, 255, 0), -1)
+            coord_text = f"{self.selected_bodypart}: ({int(current_dlc_coord[0])}, {int(current_dlc_coord[1])})"
+            if len(self.individuals) > 1:
+                coord_text = f"{self.selected_individual} {coord_text}"
+            if len(current_dlc_coord) > 2:
+                coord_text += f" conf:{current_dlc_coord[2]:.3f}"
+            cv2.putText(display_frame, coord_text, (x+15, y-10), 
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 2)
+        return display_frame
+
+    def _draw_layers(self, display_frame, scale):
+        # Layer keys: everything the cached sprites depend on
+        points = tuple(self.calibration_points)
+        highlighted = self.current_frame if any(p[2] == self.current_frame for p in points) else None
+        self.overlay.composite('points', (points, highlighted, self._diagnostics_version, scale), display_frame)
+        pending = self.input_panel.frame_num if self.input_panel is not None else None
+        self.overlay.composite('mode', (pending, len(points), self.selected_bodypart),
+                               display_frame)
+        speed = self.playback_clock.speed if self.playback_clock is not None else 1.0
+        self.overlay.composite('frame', (self.current_frame, self.total_frames, speed), display_frame)
+        self.overlay.composite('hud', (len(points), self._diagnostics_version, self.csv_path), display_frame)
+
+    def _draw_profiler(self, display_frame):
+        # Changes every frame, so it is drawn directly instead of cached
+        width = display_frame.shape[1]
+        for i, line in enumerate(self.profiler.overlay_lines()):
+            (text_width, _), _ = cv2.getTextSize(line, cv2.FONT_HERSHEY_SIMPLEX, 0.45, 1)
+            cv2.putText(display_frame, line, (width - text_width - 10, 20 + 18 * i),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.45, (0, 255, 255), 1)
     
     def run_calibration(self, root):
-        """Run interactive calibration"""
-        if not self.cap or not self.cap.isOpened():
+        """Run interactive calibration on the Tk event loop"""
+        if not self.frame_source or not self.frame_source.is_opened():
             print("Please load a video file first")
             return False
-        if self.dlc_data is None or self.selected_bodypart is None:
+        if self.dlc_coords is None or self.selected_bodypart is None:
             print("Please load CSV file and select a body part first")
             return False
         self.root = root
-        cv2.namedWindow(self.window_name, cv2.WINDOW_AUTOSIZE)
-        print(f"\nCalibration started - Body part: {self.selected_bodypart}")
+        if len(self.individuals) > 1:
+            print(f"\nCalibration started - Individual: {self.selected_individual}, "
+                  f"Body part: {self.selected_bodypart}")
+        else:
+            print(f"\nCalibration started - Body part: {self.selected_bodypart}")
         print("Controls:")
         print("  - Space: Play/Pause video")
         print("  - A/D: Step backward/forward")
         print("  - C: Add current frame as calibration point (using DLC coords)")
+        print("  - N/P: Jump to next/previous suggested frame")
+        print("  - +/-: Double/halve playback speed (0.25x to 8x)")
+        print("  - F: Show/hide profiler (FPS and per-stage timings)")
         print("  - R: Remove last calibration point")
-        print("  - ESC: Exit calibration")
+        print("  - ESC: Cancel point entry / exit calibration")
         print("  - World coordinate range: (0,0) to (75,75)")
         print("  - Recommended: choose 4-15 evenly distributed points\n")
-        playing = True
-        while True:
-            if playing and not self.inputting_coordinates:
-                ret, frame = self.cap.read()
-                if not ret:
-                    self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-                    self.current_frame = 0
-                    continue
-                self.current_frame = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES)) - 1
-                self.current_frame_img = frame
-            else:
-                frame = self.get_current_frame()
-                if frame is None:
-                    break
-            display_frame = self.draw_calibration_info(frame)
-            cv2.imshow(self.window_name, display_frame)
-            wait_time = 30 if (playing and not self.inputting_coordinates) else 1
-            key = cv2.waitKey(wait_time) & 0xFF
-            if key == 27:
-                if not self.inputting_coordinates:
-                    break
-            elif key == ord(' '):
-                if not self.inputting_coordinates:
-                    playing = not playing
-                    print("Video playing" if playing else "Video paused")
-            elif key in [ord('c'), ord('C')]:
-                if not playing:
-                    self.add_calibration_point()
-                else:
-                    print("Pause the video before adding calibration point")
-            elif key in [ord('d'), ord('D')]:
-                if not playing and not self.inputting_coordinates and self.current_frame < self.total_frames - 1:
-                    self.current_frame += 1
-            elif key in [ord('a'), ord('A')]:
-                if not playing and not self.inputting_coordinates and self.current_frame > 0:
-                    self.current_frame -= 1
-            elif key in [ord('r'), ord('R')]:
-                if not self.inputting_coordinates and len(self.calibration_points) > 0:
-                    removed_point = self.calibration_points.pop()
-                    print(f"Removed calibration point: Frame {removed_point[2]}, "
-                          f"World ({removed_point[0][0]:.1f}, {removed_point[0][1]:.1f})")
-        cv2.destroyAllWindows()
+        self.suggest_frames()
+
+        self.window = tk.Toplevel(root)
+        self.window.title(self.window_name)
+        self.window.protocol('WM_DELETE_WINDOW', self._close_window)
+        self.frame_canvas = FrameCanvas(self.window)
+        self.frame_canvas.canvas.pack(side='left')
+        self.input_panel = CoordinateInputPanel(self.window, self._confirm_point, self._cancel_point)
+        canvas = self.frame_canvas.canvas
+        canvas.bind('<Key>', self._on_key)
+        canvas.bind('<Button-1>', lambda e: canvas.focus_set())
+        canvas.focus_set()
+        self.decoder = DecodeWorker(self.frame_source)
+        self.current_frame_img = None
+        self.playing = True
+        self.playback_clock.start(self.current_frame)
+        self._request_frame(self.current_frame)
+        # Runs the Tk event loop until the window is closed
+        root.wait_window(self.window)
+
+        if self.profiler.has_data():
+            self.export_profile()
         print(f"\nCalibration finished! Total {len(self.calibration_points)} points:")
         for i, (world_coord, pixel_coord, frame_num) in enumerate(self.calibration_points):
             print(f"  P{i+1}: Frame {frame_num}, World ({world_coord[0]:.1f}, {world_coord[1]:.1f}) -> "
                   f"Pixel ({pixel_coord[0]:.1f}, {pixel_coord[1]:.1f})")
         return len(self.calibration_points) >= 4
+
+    def _close_window(self):
+        if self._after_id is not None:
+            self.window.after_cancel(self._after_id)
+            self._after_id = None
+        self.decoder.close()
+        self.window.destroy()
+
+    def _schedule_tick(self, delay_ms: float):
+        if self._after_id is not None:
+            self.window.after_cancel(self._after_id)
+        self._after_id = self.window.after(max(int(delay_ms), 1), self._tick)
+
+    def _request_frame(self, frame_num: int):
+        """Ask the decode worker for ``frame_num``; _tick displays it when ready"""
+        self._target_frame = frame_num
+        self._awaiting_frame = True
+        self._ready_frame = None
+        self.decoder.request(frame_num)
+        self._schedule_tick(1)
+
+    def _tick(self):
+        """Show the decoded frame once it is due and request the next one while playing"""
+        self._after_id = None
+        clock = self.playback_clock
+        result = self.decoder.poll()
+        if result is not None and result[0] == self._target_frame and self._awaiting_frame:
+            self._awaiting_frame = False
+            self._ready_frame = result
+        if self._ready_frame is None:
+            if self._awaiting_frame:
+                self._schedule_tick(2)
+            return
+        frame_num, frame, latency_ms = self._ready_frame
+        if self.playing and frame is not None:
+            delay = clock.delay_ms(frame_num)
+            if delay >= 1:
+                self._schedule_tick(delay)
+                return
+        self._ready_frame = None
+        if frame is None:
+            if self.playing and frame_num > 0:
+                clock.start(0)
+                self._request_frame(0)
+            elif self.current_frame_img is None:
+                self._close_window()
+            else:
+                print(f"Cannot read frame {frame_num}")
+                self._target_frame = self.current_frame
+            return
+        self.profiler.record('frame_latency', latency_ms)
+        self.current_frame = frame_num
+        self.current_frame_img = frame
+        self._render()
+        self.profiler.tick()
+        if self.playing:
+            self._request_frame(max(frame_num + 1, clock.due_frame()))
+
+    def _render(self):
+        """Redraw the displayed frame with current overlays"""
+        if self.current_frame_img is None:
+            return
+        profiler = self.profiler
+        with profiler.stage('display_proxy'):
+            display_frame = self.get_display_frame(self.current_frame_img)
+        display_frame = self.draw_calibration_info(display_frame)
+        with profiler.stage('photo'):
+            self.frame_canvas.show(display_frame)
+
+    def _on_key(self, event):
+        key = event.char.lower() if event.char else ''
+        clock = self.playback_clock
+        if event.keysym == 'Escape':
+            if self.input_panel.is_open():
+                self.input_panel.cancel()
+            else:
+                self._close_window()
+        elif key == ' ':
+            self.playing = not self.playing
+            if self.playing:
+                clock.start(self.current_frame)
+                self._request_frame(self.current_frame + 1)
+            else:
+                # Drop the frame decoded ahead for playback
+                self._target_frame = self.current_frame
+                self._awaiting_frame = False
+                self._ready_frame = None
+            print("Video playing" if self.playing else "Video paused")
+        elif key in ('+', '=', '-', '_'):
+            speed = clock.set_speed(clock.speed * (2 if key in ('+', '=') else 0.5))
+            print(f"Playback speed: {speed:g}x")
+            self._render()
+        elif key == 'f':
+            self.show_profiler = not self.show_profiler
+            # Once turned on, timings are recorded for the rest of the session
+            self.profiler.enabled = True
+            self._render()
+        elif key == 'c':
+            if not self.playing:
+                self.add_calibration_point()
+            else:
+                print("Pause the video before adding calibration point")
+        elif key == 'd':
+            if not self.playing and self._target_frame < self.total_frames - 1:
+                self._request_frame(self._target_frame + 1)
+        elif key == 'a':
+            if not self.playing and self._target_frame > 0:
+                self._request_frame(self._target_frame - 1)
+        elif key in ('n', 'p'):
+            displayed = self.current_frame
+            if self.jump_to_suggestion(1 if key == 'n' else -1):
+                # current_frame follows the displayed frame, set once it arrives
+                target, self.current_frame = self.current_frame, displayed
+                self.playing = False
+                self._request_frame(target)
+        elif key == 'r':
+            if len(self.calibration_points) > 0:
+                removed_point = self.calibration_points.pop()
+                print(f"Removed calibration point: Frame {removed_point[2]}, "
+                      f"World ({removed_point[0][0]:.1f}, {removed_point[0][1]:.1f})")
+                self.update_diagnostics()
+                self._render()
+
+    def export_profile(self, path: Optional[str] = None) -> str:
+        """Write the profiler histograms to ``path``, profile_trace_path or <video>_profile.json"""
+        path = path or self.profile_trace_path or f"{os.path.splitext(self.video_path)[0]}_profile.json"
+        self.profiler.export(path)
+        print(f"Profiler trace saved to: {path}")
+        return path
+
+    def fit_calibration(self, n_boot: int = 200, with_distortion: bool = False) -> Optional[np.ndarray]:
+        """Fit the homography (and optionally lens distortion) with RANSAC and refresh self.diagnostics"""
+        self.diagnostics = None
+        self._diagnostics_version += 1
+        self.distortion = None
+        if len(self.calibration_points) < 4:
+            return None
+        pixel_array = np.array([point[1] for point in self.calibration_points], dtype=np.float32)
+        world_array = np.array([point[0] for point in self.calibration_points], dtype=np.float32)
+        H, mask = cv2.findHomography(pixel_array, world_array, cv2.RANSAC)
+        if H is None:
+            return None
+        if with_distortion:
+            inliers = mask.ravel().astype(bool)
+            if inliers.sum() < 6:
+                print("Lens distortion needs at least 6 inlier points; using plain homography")
+            else:
+                self.distortion, _ = estimate_distortion(pixel_array[inliers], world_array[inliers], self.frame_size)
+                pixel_array = self.distortion.undistort(pixel_array).astype(np.float32)
+                H, mask = cv2.findHomography(pixel_array, world_array, cv2.RANSAC)
+                print(f"Estimated lens distortion: k1 = {self.distortion.k1:.4f}")
+        self.diagnostics = compute_diagnostics(pixel_array, world_array, H, mask, n_boot=n_boot)
+        return H
     
-    def calculate_homography(self) -> Optional[np.ndarray]:
+    def update_diagnostics(self):
+        """Recompute diagnostics after the calibration points change"""
+        with self.profiler.stage('diagnostics'):
+            self.fit_calibration(n_boot=100)
+        if self.diagnostics is not None:
+            d = self.diagnostics
+            outliers = ", ".join(f"P{i+1}" for i in d['outliers']) or "none"
+            print(f"  Mean error: {d['mean_error']:.2f} | LOO max error: {d['loo_max_error']:.2f} | "
+                  f"RANSAC outliers: {outliers}")
+    
+    def calculate_homography(self, estimate_distortion: bool = False) -> Optional[np.ndarray]:
         """Compute homography matrix from calibration points"""
         if len(self.calibration_points) < 4:
             print("Not enough calibration points to compute homography")
             return None
-        pixel_points = [point[1] for point in self.calibration_points]
-        world_points = [point[0] for point in self.calibration_points]
-        pixel_array = np.array(pixel_points, dtype=np.float32)
-        world_array = np.array(world_points, dtype=np.float32)
-        H, _ = cv2.findHomography(pixel_array, world_array, cv2.RANSAC)
+        H = self.fit_calibration(with_distortion=estimate_distortion)
+        if H is None:
+            print("Failed to compute homography (check that points are not collinear)")
+            return None
+        d = self.diagnostics
         print("\nCalibration accuracy check:")
-        print("ID | Frame | World coords      | Pixel coords      | Converted        | Error")
-        print("-" * 75)
-        errors = []
+        print("ID | Frame | World coords      | Pixel coords      | Converted        | Error | LOO   | RANSAC")
+        print("-" * 92)
+        pixel_array = np.array([point[1] for point in self.calibration_points], dtype=np.float64)
+        if self.distortion is not None:
+            pixel_array = self.distortion.undistort(pixel_array)
+        converted = apply_homography(H, pixel_array)
         for i, (world_coord, pixel_coord, frame_num) in enumerate(self.calibration_points):
-            pixel_array = np.array([[pixel_coord[0], pixel_coord[1]]], dtype=np.float32).reshape(-1, 1, 2)
-            converted = cv2.perspectiveTransform(pixel_array, H)
-            converted_coord = (converted[0][0][0], converted[0][0][1])
-            error = np.sqrt((converted_coord[0] - world_coord[0])**2 + 
-                            (converted_coord[1] - world_coord[1])**2)
-            errors.append(error)
+            status = "inlier" if d['inliers'][i] else "OUTLIER"
             print(f"{i+1:2d} | {frame_num:4d} | ({world_coord[0]:6.1f}, {world_coord[1]:6.1f}) | "
                   f"({pixel_coord[0]:6.1f}, {pixel_coord[1]:6.1f}) | "
-                  f"({converted_coord[0]:6.1f}, {converted_coord[1]:6.1f}) | {error:5.2f}")
-        avg_error = np.mean(errors)
-        max_error = np.max(errors)
-        print("-" * 75)
+                  f"({converted[i][0]:6.1f}, {converted[i][1]:6.1f}) | {d['errors'][i]:5.2f} | "
+                  f"{d['loo_errors'][i]:5.2f} | {status}")
+        avg_error = d['mean_error']
+        max_error = d['max_error']
+        print("-" * 92)
         print(f"Average error: {avg_error:.2f}")
         print(f"Max error: {max_error:.2f}")
+        if np.isfinite(d['loo_max_error']):
+            print(f"Leave-one-out error: mean {d['loo_mean_error']:.2f}, max {d['loo_max_error']:.2f}")
+        bootstrap = d['bootstrap']
+        print(f"Bootstrap {bootstrap['confidence']:.0%} error bound over arena grid: "
+              f"mean {bootstrap['mean_upper']:.2f}, max {bootstrap['max_upper']:.2f}")
+        if len(d['outliers']):
+            print(f"Warning: RANSAC rejected points {', '.join(f'P{i+1}' for i in d['outliers'])}")
         if avg_error > 2.0:
             print("Warning: Average error is high, check calibration point accuracy")
         elif avg_error < 0.5:
@@ -289,16 +612,39 @@ class InteractiveCalibrationTool:
             print("Good calibration accuracy")
         return H
     
+    def analyze_trajectories(self, homography_matrix: np.ndarray, zones: Optional[dict] = None,
+                             output_path: Optional[str] = None, **options) -> Optional[dict]:
+        """Kinematics, zone dwell times and occupancy of the selected bodypart for every individual"""
+        if self.dlc_coords is None or self.selected_bodypart_index is None:
+            return None
+        calibration = CalibrationTransformer(homography_matrix,
+                                             world_points=np.array([p[0] for p in self.calibration_points]),
+                                             distortion=self.distortion)
+        return analyze_trajectories(self.dlc_coords, calibration, self.selected_bodypart_index, self.fps,
+                                    self.individuals, zones, output_path=output_path,
+                                    input_path=self.csv_path, **options)
+
     def save_calibration_data(self, filename: str, homography_matrix: np.ndarray):
         """Save calibration data"""
-        data = {
+        metadata = {
             'video_path': self.video_path,
             'csv_path': self.csv_path,
             'selected_bodypart': self.selected_bodypart,
+            'selected_individual': self.selected_individual,
             'fps': self.fps,
-            'calibration_points': self.calibration_points,
-            'homography_matrix': homography_matrix.tolist() if homography_matrix is not None else None
         }
-        with open(filename, 'wb') as f:
-            pickle.dump(data, f)
+        # Background features of this video let later sessions detect a moved camera
+        reference = None
+        if self.video_path:
+            try:
+                reference = build_reference(self.video_path)
+            except IOError as e:
+                print(f"Warning: saving without drift reference features ({e})")
+        save_calibration(filename, homography_matrix,
+                         [point[1] for point in self.calibration_points],
+                         [point[0] for point in self.calibration_points],
+                         [point[2] for point in self.calibration_points],
+                         metadata, distortion=self.distortion, reference=reference)
         print(f"Calibration data saved to: {filename}")
+        if reference is not None:
+            print(f"  Stored {len(reference.keypoints)} reference keypoints for drift checks (check_drift.py)")
@@ -0,0 +1,124 @@
+import argparse
+import glob
+import os
+import time
+from functools import partial
+from typing import List, Optional
+from batch import cached_calibration, run_parallel, write_report
+from calibration_io import save_calibration
+from drift import check_drift
+
+REPORT_FIELDS = ['video_path', 'calibration_path', 'status', 'reason', 'matches', 'inliers',
+                 'mean_displacement_px', 'max_displacement_px', 'corrected_calibration', 'seconds', 'error']
+
+
+def corrected_calibration_path(video_path: str, output_dir: Optional[str] = None) -> str:
+    """``<video>_calibration.npz``, next to the video or in ``output_dir``"""
+    path = f"{os.path.splitext(video_path)[0]}_calibration.npz"
+    return os.path.join(output_dir, os.path.basename(path)) if output_dir else path
+
+
+def check_session(video_path: str, calibration_path: str, samples: int = 5, tolerance_px: float = 1.0,
+                  max_correction_px: float = 50.0, min_inliers: int = 30, write_corrected: bool = False,
+                  output_dir: Optional[str] = None, allow_pickle: bool = False) -> dict:
+    """Check one video for camera drift, reporting failures instead of raising
+
+    With ``write_corrected`` a 'corrected' session gets its own calibration
+    file: the original calibration plus the drift homography, which
+    pixel_to_world applies before the calibrated mapping.
+    """
+    start = time.perf_counter()
+    result = {'video_path': video_path, 'calibration_path': calibration_path, 'status': 'failed', 'reason': '',
+              'matches': 0, 'inliers': 0, 'mean_displacement_px': None, 'max_displacement_px': None,
+              'corrected_calibration': '', 'error': ''}
+    try:
+        calibration = cached_calibration(calibration_path, allow_pickle)
+        if calibration.reference is None:
+            result['status'] = 'no_reference'
+            result['reason'] = "calibration has no reference features; save it again with this version"
+        else:
+            drift = check_drift(calibration.reference, video_path, samples, tolerance_px, max_correction_px,
+                                min_inliers)
+            for key in ('status', 'reason', 'matches', 'inliers'):
+                result[key] = drift[key]
+            for key in ('mean_displacement_px', 'max_displacement_px'):
+                result[key] = round(drift[key], 3)
+            if drift['status'] == 'corrected' and write_corrected:
+                output_path = corrected_calibration_path(video_path, output_dir)
+                if os.path.dirname(output_path):
+                    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+                metadata = dict(calibration.metadata, drift_video_path=video_path,
+                                drift_max_displacement_px=drift['max_displacement_px'],
+                                drift_inliers=drift['inliers'])
+                save_calibration(output_path, calibration.H, calibration.pixel_points, calibration.world_points,
+                                 calibration.frames, metadata, distortion=calibration.distortion,
+                                 lut_step=calibration.metadata.get('lut_step', 4),
+                                 reference=calibration.reference, drift=drift['homography'])
+                result['corrected_calibration'] = output_path
+    except Exception as e:
+        result['status'] = 'failed'
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def _describe_session(result: dict) -> str:
+    if result['status'] == 'failed':
+        detail = result['error']
+    elif result['max_displacement_px'] is not None:
+        detail = f"drift {result['max_displacement_px']:.2f} px, {result['inliers']} inliers"
+    else:
+        detail = result['reason']
+    if result['status'] == 'recalibrate' and result['reason']:
+        detail += f" ({result['reason']})"
+    return f"{result['status'].upper():12s} {result['video_path']}: {detail}"
+
+
+def check_sessions(video_paths: List[str], calibration_path: str, workers: Optional[int] = None,
+                   **options) -> List[dict]:
+    """Check many videos on a process pool, printing progress as they finish"""
+    check = partial(check_session, calibration_path=calibration_path, **options)
+    return run_parallel(check, [(path,) for path in video_paths], workers, _describe_session)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detect camera drift against a calibration's reference frame")
+    parser.add_argument('calibration', help="Calibration file saved with reference features")
+    parser.add_argument('videos', nargs='+', help="Videos or glob patterns to check")
+    parser.add_argument('--samples', type=int, default=5,
+                        help="Frames decoded per video for the background (default: 5)")
+    parser.add_argument('--tolerance', type=float, default=1.0,
+                        help="Drift in pixels below which the calibration is kept as is (default: 1)")
+    parser.add_argument('--max-correction', type=float, default=50.0,
+                        help="Largest drift in pixels that is corrected automatically (default: 50)")
+    parser.add_argument('--min-inliers', type=int, default=30,
+                        help="Fewest RANSAC feature matches to trust a correction (default: 30)")
+    parser.add_argument('--write-corrected', action='store_true',
+                        help="Write <video>_calibration.npz with the drift correction for corrected sessions")
+    parser.add_argument('--output-dir', help="Directory for corrected calibrations (default: next to videos)")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="Number of worker processes (default: number of CPUs)")
+    parser.add_argument('--allow-pickle', action='store_true',
+                        help="Allow reading legacy .pkl calibrations (only from trusted sources)")
+    parser.add_argument('--report', default='drift_report.csv',
+                        help="Per-video summary report, .csv or .json (default: drift_report.csv)")
+    args = parser.parse_args()
+
+    video_paths = []
+    for pattern in args.videos:
+        video_paths.extend(sorted(glob.glob(pattern, recursive=True)) or [pattern])
+    start = time.perf_counter()
+    results = check_sessions(video_paths, args.calibration, args.workers, samples=args.samples,
+                             tolerance_px=args.tolerance, max_correction_px=args.max_correction,
+                             min_inliers=args.min_inliers, write_corrected=args.write_corrected,
+                             output_dir=args.output_dir, allow_pickle=args.allow_pickle)
+    write_report(results, args.report, REPORT_FIELDS)
+    counts = {status: sum(r['status'] == status for r in results)
+              for status in ('ok', 'corrected', 'recalibrate', 'no_reference', 'failed')}
+    summary = ", ".join(f"{count} {status}" for status, count in counts.items() if count)
+    print(f"\nChecked {len(results)} videos in {time.perf_counter() - start:.1f}s: {summary}")
+    print(f"Report saved to: {args.report}")
+
+
+if __name__ == "__main__":
+    main()
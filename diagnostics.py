@@ -0,0 +1,154 @@
+import numpy as np
+from typing import Optional, Tuple
+from geometry import apply_homography
+
+
+def _normalization(points: np.ndarray) -> np.ndarray:
+    """Similarity transforms moving each point set to zero mean and sqrt(2) mean radius"""
+    centroid = np.nanmean(points, axis=-2)
+    radius = np.nanmean(np.linalg.norm(points - centroid[..., None, :], axis=-1), axis=-1)
+    scale = np.sqrt(2) / np.maximum(radius, 1e-12)
+    T = np.zeros(points.shape[:-2] + (3, 3))
+    T[..., 0, 0] = scale
+    T[..., 1, 1] = scale
+    T[..., 0, 2] = -scale * centroid[..., 0]
+    T[..., 1, 2] = -scale * centroid[..., 1]
+    T[..., 2, 2] = 1.0
+    return T
+
+
+def fit_homographies(pixel: np.ndarray, world: np.ndarray) -> np.ndarray:
+    """Least-squares homographies for a batch of point sets in one SVD call
+
+    ``pixel`` and ``world`` are (batch, n, 2) or (n, 2) arrays with n >= 4.
+    Uses the normalized DLT, i.e. cv2.findHomography with method 0 minus
+    its final Levenberg-Marquardt refinement. Degenerate point sets give
+    NaN matrices.
+    """
+    pixel = np.asarray(pixel, dtype=np.float64)
+    world = np.asarray(world, dtype=np.float64)
+    T_pixel = _normalization(pixel)
+    T_world = _normalization(world)
+    p = apply_homography(T_pixel, pixel) if pixel.ndim == 2 else _apply_batch(T_pixel, pixel)
+    w = apply_homography(T_world, world) if world.ndim == 2 else _apply_batch(T_world, world)
+    x, y = p[..., 0], p[..., 1]
+    u, v = w[..., 0], w[..., 1]
+    zeros = np.zeros_like(x)
+    ones = np.ones_like(x)
+    rows_u = np.stack([-x, -y, -ones, zeros, zeros, zeros, u * x, u * y, u], axis=-1)
+    rows_v = np.stack([zeros, zeros, zeros, -x, -y, -ones, v * x, v * y, v], axis=-1)
+    A = np.concatenate([rows_u, rows_v], axis=-2)
+    _, singular, vh = np.linalg.svd(A)
+    H_norm = vh[..., -1, :].reshape(A.shape[:-2] + (3, 3))
+    H = np.linalg.inv(T_world) @ H_norm @ T_pixel
+    H = H / H[..., 2:3, 2:3]
+    # A rank-deficient system (e.g. collinear or repeated points) has more
+    # than one null vector, so the solution is not unique
+    degenerate = singular[..., 7] < 1e-9 * singular[..., 0]
+    H[degenerate] = np.nan
+    return H
+
+
+def _apply_batch(T: np.ndarray, points: np.ndarray) -> np.ndarray:
+    x = points[..., 0]
+    y = points[..., 1]
+    w = T[:, 2, 0, None] * x + T[:, 2, 1, None] * y + T[:, 2, 2, None]
+    return np.stack([(T[:, 0, 0, None] * x + T[:, 0, 1, None] * y + T[:, 0, 2, None]) / w,
+                     (T[:, 1, 0, None] * x + T[:, 1, 1, None] * y + T[:, 1, 2, None]) / w], axis=-1)
+
+
+def reprojection_errors(H: np.ndarray, pixel: np.ndarray, world: np.ndarray) -> np.ndarray:
+    """World-space distance between each mapped pixel point and its world point"""
+    return np.linalg.norm(apply_homography(H, pixel) - np.asarray(world, dtype=np.float64), axis=-1)
+
+
+def leave_one_out_errors(pixel: np.ndarray, world: np.ndarray) -> np.ndarray:
+    """Error of each point when predicted by a homography fitted without it
+
+    Needs at least five points; returns NaN for every point otherwise.
+    """
+    pixel = np.asarray(pixel, dtype=np.float64)
+    world = np.asarray(world, dtype=np.float64)
+    n = len(pixel)
+    if n < 5:
+        return np.full(n, np.nan)
+    # Row i of ``subsets`` lists every point index except i
+    subsets = np.nonzero(~np.eye(n, dtype=bool))[1].reshape(n, n - 1)
+    H = fit_homographies(pixel[subsets], world[subsets])
+    predicted = _apply_batch(H, pixel[:, None, :])[:, 0]
+    return np.linalg.norm(predicted - world, axis=-1)
+
+
+def world_grid(world_range: Tuple[float, float] = (0.0, 75.0), step: float = 5.0) -> np.ndarray:
+    """(g, g, 2) grid of world coordinates covering the arena"""
+    ticks = np.arange(world_range[0], world_range[1] + step / 2, step)
+    gx, gy = np.meshgrid(ticks, ticks)
+    return np.stack([gx, gy], axis=-1)
+
+
+def bootstrap_grid_errors(pixel: np.ndarray, world: np.ndarray, H: np.ndarray, n_boot: int = 200,
+                          confidence: float = 0.95, world_range: Tuple[float, float] = (0.0, 75.0),
+                          grid_step: float = 5.0, seed: Optional[int] = 0) -> dict:
+    """Bootstrap confidence bounds on the mapping error across a world grid
+
+    The calibration points are resampled with replacement ``n_boot`` times
+    and each resample is refitted. The grid is mapped to pixels with ``H``
+    and back to world with every refit; the returned ``upper`` array holds,
+    per grid node, the ``confidence`` quantile of the distance between the
+    refitted and the original world position.
+    """
+    pixel = np.asarray(pixel, dtype=np.float64)
+    world = np.asarray(world, dtype=np.float64)
+    grid = world_grid(world_range, grid_step)
+    rng = np.random.default_rng(seed)
+    samples = rng.integers(0, len(pixel), size=(n_boot, len(pixel)))
+    H_boot = fit_homographies(pixel[samples], world[samples])
+    grid_pixel = apply_homography(np.linalg.inv(H), grid.reshape(-1, 2))
+    mapped = _apply_batch(H_boot, np.broadcast_to(grid_pixel, (n_boot,) + grid_pixel.shape))
+    deviation = np.linalg.norm(mapped - grid.reshape(-1, 2), axis=-1)
+    valid = np.all(np.isfinite(deviation), axis=1)
+    if not valid.any():
+        upper = np.full(grid.shape[:2], np.nan)
+    else:
+        upper = np.quantile(deviation[valid], confidence, axis=0).reshape(grid.shape[:2])
+    return {
+        'grid': grid,
+        'upper': upper,
+        'confidence': confidence,
+        'n_valid': int(valid.sum()),
+        'mean_upper': float(np.mean(upper)),
+        'max_upper': float(np.max(upper)),
+    }
+
+
+def compute_diagnostics(pixel: np.ndarray, world: np.ndarray, H: np.ndarray,
+                        inlier_mask: Optional[np.ndarray] = None, n_boot: int = 200,
+                        world_range: Tuple[float, float] = (0.0, 75.0)) -> dict:
+    """Reprojection, RANSAC, leave-one-out and bootstrap diagnostics of a calibration
+
+    ``inlier_mask`` is the mask returned by cv2.findHomography; without it
+    every point counts as an inlier. Leave-one-out and bootstrap use the
+    inliers only, matching the RANSAC fit; an outlier is already held out,
+    so its leave-one-out error is its plain reprojection error.
+    """
+    pixel = np.asarray(pixel, dtype=np.float64).reshape(-1, 2)
+    world = np.asarray(world, dtype=np.float64).reshape(-1, 2)
+    errors = reprojection_errors(H, pixel, world)
+    if inlier_mask is None:
+        inliers = np.ones(len(pixel), dtype=bool)
+    else:
+        inliers = np.asarray(inlier_mask).ravel().astype(bool)
+    loo = errors.copy()
+    loo[inliers] = leave_one_out_errors(pixel[inliers], world[inliers])
+    return {
+        'errors': errors,
+        'mean_error': float(errors.mean()),
+        'max_error': float(errors.max()),
+        'inliers': inliers,
+        'outliers': np.flatnonzero(~inliers),
+        'loo_errors': loo,
+        'loo_mean_error': float(np.nanmean(loo)) if np.isfinite(loo).any() else float('nan'),
+        'loo_max_error': float(np.nanmax(loo)) if np.isfinite(loo).any() else float('nan'),
+        'bootstrap': bootstrap_grid_errors(pixel[inliers], world[inliers], H, n_boot=n_boot,
+                                           world_range=world_range),
+    }
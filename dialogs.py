@@ -1,81 +1,123 @@
 import tkinter as tk
-from tkinter import messagebox
-
-class CoordinateInputDialog:
-    def __init__(self, parent, frame_num, dlc_coord):
-        self.result = None
-        self.dialog = tk.Toplevel(parent)
-        self.dialog.title(f"Enter World Coordinates for Frame {frame_num}")
-        self.dialog.geometry("400x250")
-        self.dialog.transient(parent)
-        self.dialog.grab_set()
-
-        self.dialog.update_idletasks()
-        x = (self.dialog.winfo_screenwidth() // 2) - (self.dialog.winfo_width() // 2)
-        y = (self.dialog.winfo_screenheight() // 2) - (self.dialog.winfo_height() // 2)
-        self.dialog.geometry(f"+{x}+{y}")
-
-        info_frame = tk.Frame(self.dialog)
-        info_frame.pack(pady=10)
-
-        tk.Label(info_frame, text=f"Calibration Point for Frame {frame_num}", font=("Arial", 12, "bold")).pack()
-        tk.Label(info_frame, text=f"DeepLabCut Coordinate: ({dlc_coord[0]:.1f}, {dlc_coord[1]:.1f})",
-                 font=("Arial", 10)).pack()
-        if len(dlc_coord) > 2:
-            tk.Label(info_frame, text=f"Likelihood: {dlc_coord[2]:.3f}",
-                     font=("Arial", 10)).pack()
-        tk.Label(info_frame, text="Please enter corresponding world coordinates (range: 0–75)",
-                 font=("Arial", 10)).pack()
-
-        coord_frame = tk.Frame(self.dialog)
-        coord_frame.pack(pady=15)
-
+from typing import Tuple
+
+WORLD_RANGE = (0.0, 75.0)
+
+
+def parse_world_coordinates(x_text: str, y_text: str) -> Tuple[float, float]:
+    """Validate entered world coordinates, raising ValueError with a message for the user"""
+    try:
+        x = float(x_text)
+        y = float(y_text)
+    except ValueError:
+        raise ValueError("Please enter valid numbers")
+    lo, hi = WORLD_RANGE
+    if not (lo <= x <= hi):
+        raise ValueError(f"X coordinate must be in range {lo:g}–{hi:g}")
+    if not (lo <= y <= hi):
+        raise ValueError(f"Y coordinate must be in range {lo:g}–{hi:g}")
+    return x, y
+
+
+class CoordinateInputPanel:
+    """Non-modal world coordinate entry docked beside the video
+
+    It grabs nothing and never waits, so the video keeps playing while
+    coordinates are typed; keys go to the entries until the video is
+    clicked again. The point belongs to the frame passed to show(),
+    whatever is displayed when it is confirmed. ``on_confirm(frame_num,
+    dlc_coord, world_coord)`` and ``on_cancel()`` are called after the
+    panel hides.
+    """
+
+    def __init__(self, parent, on_confirm, on_cancel):
+        self.on_confirm = on_confirm
+        self.on_cancel = on_cancel
+        self.frame_num = None
+        self.dlc_coord = None
+        self.frame = tk.Frame(parent, padx=15, pady=15)
+
+        self.title_label = tk.Label(self.frame, font=("Arial", 12, "bold"))
+        self.title_label.pack(anchor='w')
+        self.dlc_label = tk.Label(self.frame, font=("Arial", 10))
+        self.dlc_label.pack(anchor='w')
+        self.likelihood_label = tk.Label(self.frame, font=("Arial", 10))
+        self.likelihood_label.pack(anchor='w')
+        lo, hi = WORLD_RANGE
+        tk.Label(self.frame, text=f"Enter world coordinates (range: {lo:g}–{hi:g})",
+                 font=("Arial", 10)).pack(anchor='w', pady=(10, 0))
+
+        coord_frame = tk.Frame(self.frame)
+        coord_frame.pack(pady=10, anchor='w')
         tk.Label(coord_frame, text="X coordinate:", font=("Arial", 10)).grid(row=0, column=0, padx=5, pady=5)
         self.x_entry = tk.Entry(coord_frame, width=10, font=("Arial", 10))
         self.x_entry.grid(row=0, column=1, padx=5, pady=5)
-        self.x_entry.focus()
-
         tk.Label(coord_frame, text="Y coordinate:", font=("Arial", 10)).grid(row=1, column=0, padx=5, pady=5)
         self.y_entry = tk.Entry(coord_frame, width=10, font=("Arial", 10))
         self.y_entry.grid(row=1, column=1, padx=5, pady=5)
 
-        button_frame = tk.Frame(self.dialog)
-        button_frame.pack(pady=15)
+        self.error_label = tk.Label(self.frame, fg='red', font=("Arial", 10))
+        self.error_label.pack(anchor='w')
 
+        button_frame = tk.Frame(self.frame)
+        button_frame.pack(pady=10, anchor='w')
         tk.Button(button_frame, text="Confirm", command=self.confirm,
-                  width=8, font=("Arial", 10)).pack(side='left', padx=10)
+                  width=8, font=("Arial", 10)).pack(side='left', padx=5)
         tk.Button(button_frame, text="Cancel", command=self.cancel,
-                  width=8, font=("Arial", 10)).pack(side='left', padx=10)
+                  width=8, font=("Arial", 10)).pack(side='left', padx=5)
 
-        self.dialog.bind('<Return>', lambda e: self.confirm())
-        self.dialog.bind('<Escape>', lambda e: self.cancel())
+        for entry in (self.x_entry, self.y_entry):
+            entry.bind('<Return>', lambda e: self.confirm())
+            entry.bind('<Escape>', lambda e: self.cancel())
+
+    def is_open(self) -> bool:
+        return self.frame_num is not None
+
+    def show(self, frame_num, dlc_coord, low_confidence: bool = False):
+        self.frame_num = frame_num
+        self.dlc_coord = dlc_coord
+        self.title_label.config(text=f"Calibration Point for Frame {frame_num}")
+        self.dlc_label.config(text=f"DeepLabCut Coordinate: ({dlc_coord[0]:.1f}, {dlc_coord[1]:.1f})")
+        if len(dlc_coord) > 2:
+            text = f"Likelihood: {dlc_coord[2]:.3f}" + (" (low confidence)" if low_confidence else "")
+            self.likelihood_label.config(text=text, fg='orange' if low_confidence else 'black')
+        else:
+            self.likelihood_label.config(text="")
+        self.error_label.config(text="")
+        self.x_entry.delete(0, tk.END)
+        self.y_entry.delete(0, tk.END)
+        self.frame.pack(side='right', fill='y')
+        self.x_entry.focus_set()
+
+    def hide(self):
+        self.frame_num = None
+        self.dlc_coord = None
+        self.frame.pack_forget()
 
     def confirm(self):
         try:
-            x = float(self.x_entry.get())
-            y = float(self.y_entry.get())
-            if not (0 <= x <= 75):
-                messagebox.showerror("Error", "X coordinate must be in range 0–75", parent=self.dialog)
-                return
-            if not (0 <= y <= 75):
-                messagebox.showerror("Error", "Y coordinate must be in range 0–75", parent=self.dialog)
-                return
-            self.result = (x, y)
-            self.dialog.destroy()
-        except ValueError:
-            messagebox.showerror("Error", "Please enter valid numbers", parent=self.dialog)
+            world_coord = parse_world_coordinates(self.x_entry.get(), self.y_entry.get())
+        except ValueError as e:
+            self.error_label.config(text=str(e))
+            return
+        frame_num, dlc_coord = self.frame_num, self.dlc_coord
+        self.hide()
+        self.on_confirm(frame_num, dlc_coord, world_coord)
 
     def cancel(self):
-        self.result = None
-        self.dialog.destroy()
+        self.hide()
+        self.on_cancel()
 
 
 class BodyPartSelectionDialog:
-    def __init__(self, parent, bodyparts):
+    def __init__(self, parent, bodyparts, individuals=None):
         self.result = None
+        self.individual = None
+        self.individuals = list(individuals or [])
+        multi_animal = len(self.individuals) > 1
         self.dialog = tk.Toplevel(parent)
         self.dialog.title("Select Body Part for Calibration")
-        self.dialog.geometry("400x300")
+        self.dialog.geometry("600x300" if multi_animal else "400x300")
         self.dialog.transient(parent)
         self.dialog.grab_set()
 
@@ -84,23 +126,18 @@ class BodyPartSelectionDialog:
         y = (self.dialog.winfo_screenheight() // 2) - (self.dialog.winfo_height() // 2)
         self.dialog.geometry(f"+{x}+{y}")
 
-        tk.Label(self.dialog, text="Please select a body part to use for calibration:",
-                 font=("Arial", 12, "bold")).pack(pady=10)
+        title = "Please select an individual and body part for calibration:" if multi_animal \
+            else "Please select a body part to use for calibration:"
+        tk.Label(self.dialog, text=title, font=("Arial", 12, "bold")).pack(pady=10)
 
-        list_frame = tk.Frame(self.dialog)
-        list_frame.pack(pady=10, padx=20, fill='both', expand=True)
+        lists_frame = tk.Frame(self.dialog)
+        lists_frame.pack(pady=10, padx=20, fill='both', expand=True)
 
-        scrollbar = tk.Scrollbar(list_frame)
-        scrollbar.pack(side='right', fill='y')
-
-        self.listbox = tk.Listbox(list_frame, yscrollcommand=scrollbar.set, font=("Arial", 10))
-        self.listbox.pack(side='left', fill='both', expand=True)
-        scrollbar.config(command=self.listbox.yview)
+        self.individual_listbox = None
+        if multi_animal:
+            self.individual_listbox = self._make_listbox(lists_frame, self.individuals)
 
-        for bodypart in bodyparts:
-            self.listbox.insert(tk.END, bodypart)
-        if bodyparts:
-            self.listbox.select_set(0)
+        self.listbox = self._make_listbox(lists_frame, bodyparts)
 
         button_frame = tk.Frame(self.dialog)
         button_frame.pack(pady=15)
@@ -114,10 +151,32 @@ class BodyPartSelectionDialog:
         self.dialog.bind('<Return>', lambda e: self.confirm())
         self.dialog.bind('<Escape>', lambda e: self.cancel())
 
+    def _make_listbox(self, parent, items):
+        list_frame = tk.Frame(parent)
+        list_frame.pack(side='left', padx=5, fill='both', expand=True)
+
+        scrollbar = tk.Scrollbar(list_frame)
+        scrollbar.pack(side='right', fill='y')
+
+        listbox = tk.Listbox(list_frame, yscrollcommand=scrollbar.set, font=("Arial", 10), exportselection=False)
+        listbox.pack(side='left', fill='both', expand=True)
+        scrollbar.config(command=listbox.yview)
+
+        for item in items:
+            listbox.insert(tk.END, item)
+        if items:
+            listbox.select_set(0)
+        return listbox
+
     def confirm(self):
         selection = self.listbox.curselection()
         if selection:
             self.result = self.listbox.get(selection[0])
+            if self.individual_listbox is not None:
+                individual = self.individual_listbox.curselection()
+                self.individual = self.individuals[individual[0] if individual else 0]
+            elif self.individuals:
+                self.individual = self.individuals[0]
         self.dialog.destroy()
 
     def cancel(self):
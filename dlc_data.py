@@ -0,0 +1,141 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from typing import List, Optional, Tuple
+
+COORD_FIELDS = ('x', 'y', 'likelihood')
+CACHE_VERSION = 2
+SINGLE_INDIVIDUAL = ''
+
+
+def build_coordinate_index(df: pd.DataFrame) -> Tuple[np.ndarray, List[str], List[str], str]:
+    """Pack a DeepLabCut table into a (frames, individuals, bodyparts, 3) float32 array
+
+    The last axis holds x, y and likelihood. Single-animal tables get one
+    individual named SINGLE_INDIVIDUAL. Bodyparts an individual does not
+    have (maDLC unique bodyparts) are NaN; a missing likelihood column is
+    filled with 1.0 so every lookup returns the same three fields.
+    """
+    columns = df.columns
+    multi_animal = columns.nlevels == 4
+    scorer = columns.get_level_values(0)[0]
+    bodypart_level = 2 if multi_animal else 1
+    if multi_animal:
+        individuals = list(dict.fromkeys(columns.get_level_values(1)))
+    else:
+        individuals = [SINGLE_INDIVIDUAL]
+    bodyparts = list(dict.fromkeys(columns.get_level_values(bodypart_level)))
+    bodyparts = [bp for bp in bodyparts if bp and bp not in ('bodyparts', 'coords')]
+    individual_index = {name: i for i, name in enumerate(individuals)}
+    bodypart_index = {name: j for j, name in enumerate(bodyparts)}
+    field_index = {name: k for k, name in enumerate(COORD_FIELDS)}
+    coords = np.full((len(df), len(individuals), len(bodyparts), 3), np.nan, dtype=np.float32)
+    has_x = np.zeros((len(individuals), len(bodyparts)), dtype=bool)
+    has_likelihood = np.zeros_like(has_x)
+    for position, column in enumerate(columns):
+        individual = column[1] if multi_animal else SINGLE_INDIVIDUAL
+        bodypart = column[bodypart_level]
+        if bodypart not in bodypart_index or column[-1] not in field_index:
+            continue
+        i, j, k = individual_index[individual], bodypart_index[bodypart], field_index[column[-1]]
+        coords[:, i, j, k] = df.iloc[:, position].to_numpy(dtype=np.float32)
+        has_x[i, j] |= k == 0
+        has_likelihood[i, j] |= k == 2
+    coords[:, has_x & ~has_likelihood, 2] = 1.0
+    return coords, individuals, bodyparts, scorer
+
+
+def detect_header_rows(csv_path: str) -> List[int]:
+    """Header rows of a DeepLabCut CSV: three for single-animal, four for maDLC"""
+    with open(csv_path, 'r', newline='') as f:
+        f.readline()
+        second = f.readline().split(',', 1)[0].strip()
+    return [0, 1, 2, 3] if second == 'individuals' else [0, 1, 2]
+
+
+def read_dlc_csv(csv_path: str) -> Tuple[np.ndarray, List[str], List[str], str]:
+    """Read a single- or multi-animal DeepLabCut CSV file into a coordinate index"""
+    df = pd.read_csv(csv_path, header=detect_header_rows(csv_path), index_col=0)
+    return build_coordinate_index(df)
+
+
+def read_dlc_h5(h5_path: str) -> Tuple[np.ndarray, List[str], List[str], str]:
+    """Read a DeepLabCut H5 file into a coordinate index (requires PyTables)"""
+    df = pd.read_hdf(h5_path)
+    return build_coordinate_index(df)
+
+
+def cache_paths(csv_path: str) -> Tuple[str, str]:
+    """Array and metadata paths of the binary cache of a CSV file"""
+    root = os.path.splitext(csv_path)[0]
+    return root + '.dlccache.npy', root + '.dlccache.json'
+
+
+def _source_signature(path: str) -> dict:
+    stat = os.stat(path)
+    return {'version': CACHE_VERSION, 'source': os.path.abspath(path),
+            'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def load_cache(csv_path: str) -> Optional[Tuple[np.ndarray, List[str], List[str], str]]:
+    """Memory-map the cached index of a CSV file, or return None if stale"""
+    array_path, meta_path = cache_paths(csv_path)
+    try:
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        if meta.get('signature') != _source_signature(csv_path):
+            return None
+        coords = np.load(array_path, mmap_mode='r', allow_pickle=False)
+    except (OSError, ValueError):
+        return None
+    if coords.shape != tuple(meta['shape']):
+        return None
+    return coords, meta['individuals'], meta['bodyparts'], meta['scorer']
+
+
+def save_cache(csv_path: str, coords: np.ndarray, individuals: List[str], bodyparts: List[str], scorer: str):
+    """Write the binary cache next to a CSV file"""
+    array_path, meta_path = cache_paths(csv_path)
+    meta = {'signature': _source_signature(csv_path), 'shape': list(coords.shape),
+            'individuals': individuals, 'bodyparts': bodyparts, 'scorer': scorer}
+    # Write to temporary files first so a crash never leaves a half cache
+    # (np.save appends .npy to names without it)
+    np.save(array_path + '.tmp.npy', coords, allow_pickle=False)
+    with open(meta_path + '.tmp', 'w') as f:
+        json.dump(meta, f)
+    os.replace(array_path + '.tmp.npy', array_path)
+    os.replace(meta_path + '.tmp', meta_path)
+
+
+def read_dlc_file(path: str, use_cache: bool = True) -> Tuple[np.ndarray, List[str], List[str], str]:
+    """Read DeepLabCut output into a coordinate index as fast as possible
+
+    H5 files are read directly. For CSV files a valid binary cache is
+    memory-mapped; otherwise the sibling H5 file is read when PyTables is
+    available, falling back to parsing the CSV, and the cache is written
+    for the next open.
+    """
+    if path.lower().endswith(('.h5', '.hdf5')):
+        return read_dlc_h5(path)
+    if use_cache:
+        cached = load_cache(path)
+        if cached is not None:
+            return cached
+    index = None
+    h5_path = os.path.splitext(path)[0] + '.h5'
+    # DeepLabCut writes the H5 just before the CSV; a much older H5 means
+    # the CSV was edited afterwards
+    if os.path.exists(h5_path) and os.path.getmtime(h5_path) >= os.path.getmtime(path) - 60:
+        try:
+            index = read_dlc_h5(h5_path)
+        except ImportError:
+            pass
+    if index is None:
+        index = read_dlc_csv(path)
+    if use_cache:
+        try:
+            save_cache(path, *index)
+        except OSError as e:
+            print(f"Could not write CSV cache: {e}")
+    return index
@@ -0,0 +1,145 @@
+import cv2
+import numpy as np
+from typing import List, Tuple
+from geometry import apply_homography
+
+DEFAULT_FEATURES = 2000
+
+
+class ReferenceFeatures:
+    """ORB keypoints and descriptors of the static background a calibration was made on
+
+    Stored with the calibration so later sessions from the same rig can be
+    matched against it to detect a moved camera.
+    """
+
+    def __init__(self, keypoints: np.ndarray, descriptors: np.ndarray, image_size: Tuple[int, int]):
+        self.keypoints = np.asarray(keypoints, dtype=np.float32).reshape(-1, 2)
+        self.descriptors = np.asarray(descriptors, dtype=np.uint8).reshape(len(self.keypoints), -1)
+        self.image_size = (int(image_size[0]), int(image_size[1]))
+
+    @classmethod
+    def detect(cls, image: np.ndarray, n_features: int = DEFAULT_FEATURES) -> 'ReferenceFeatures':
+        """Detect ORB features on a grayscale or BGR image"""
+        if image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        orb = cv2.ORB_create(nfeatures=n_features)
+        keypoints, descriptors = orb.detectAndCompute(image, None)
+        if descriptors is None:
+            return cls(np.empty((0, 2)), np.empty((0, 32)), image.shape[1::-1])
+        return cls(np.array([kp.pt for kp in keypoints]), descriptors, image.shape[1::-1])
+
+    def to_header(self) -> dict:
+        return {'detector': 'ORB', 'image_size': list(self.image_size), 'num_keypoints': len(self.keypoints)}
+
+
+def sample_frames(video_path: str, count: int = 5) -> List[np.ndarray]:
+    """Decode ``count`` grayscale frames spread evenly over a video
+
+    Only the sampled frames (and the GOP in front of each) are decoded, so
+    the cost does not depend on the video length.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Cannot open video file: {video_path}")
+    try:
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        positions = np.linspace(0, max(total - 1, 0), count + 2)[1:-1].round().astype(int) if total > 0 else [0]
+        frames = []
+        for position in positions:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(position))
+            ret, frame = cap.read()
+            if ret:
+                frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+    finally:
+        cap.release()
+    if not frames:
+        raise IOError(f"Cannot read frames from: {video_path}")
+    return frames
+
+
+def background_image(frames: List[np.ndarray]) -> np.ndarray:
+    """Per-pixel median of the sampled frames, which removes the moving animals"""
+    stack = np.stack(frames)
+    middle = len(frames) // 2
+    return np.partition(stack, middle, axis=0)[middle]
+
+
+def build_reference(video_path: str, samples: int = 9, n_features: int = DEFAULT_FEATURES) -> ReferenceFeatures:
+    """Reference features of a video's static background"""
+    return ReferenceFeatures.detect(background_image(sample_frames(video_path, samples)), n_features)
+
+
+def estimate_drift(reference: ReferenceFeatures, image: np.ndarray, n_features: int = DEFAULT_FEATURES,
+                   ratio: float = 0.75, ransac_threshold: float = 3.0, grid: int = 9) -> dict:
+    """Homography from a new background image to the reference image
+
+    Features are matched with a brute-force Hamming matcher and Lowe's
+    ratio test, then the homography is fitted with RANSAC. Displacement is
+    measured on a ``grid`` x ``grid`` lattice over the image: how far each
+    point has to move to land on its reference position. ``homography``
+    is None when fewer than four matches survive.
+    """
+    current = ReferenceFeatures.detect(image, n_features)
+    result = {'homography': None, 'keypoints': len(current.keypoints), 'matches': 0, 'inliers': 0,
+              'inlier_ratio': 0.0, 'mean_displacement_px': float('nan'), 'max_displacement_px': float('nan')}
+    if len(current.keypoints) < 4 or len(reference.keypoints) < 4:
+        return result
+    matcher = cv2.BFMatcher(cv2.NORM_HAMMING)
+    pairs = [m for m in matcher.knnMatch(current.descriptors, reference.descriptors, k=2) if len(m) == 2]
+    if not pairs:
+        return result
+    index = np.array([[m.queryIdx, m.trainIdx] for m, _ in pairs])
+    distance = np.array([[m.distance, n.distance] for m, n in pairs])
+    good = distance[:, 0] < ratio * distance[:, 1]
+    result['matches'] = int(good.sum())
+    if result['matches'] < 4:
+        return result
+    source = current.keypoints[index[good, 0]]
+    target = reference.keypoints[index[good, 1]]
+    H, mask = cv2.findHomography(source, target, cv2.RANSAC, ransac_threshold)
+    if H is None:
+        return result
+    width, height = current.image_size
+    lattice = np.stack(np.meshgrid(np.linspace(0, width - 1, grid), np.linspace(0, height - 1, grid)),
+                       axis=-1).reshape(-1, 2)
+    displacement = np.linalg.norm(apply_homography(H, lattice) - lattice, axis=1)
+    result.update({
+        'homography': H,
+        'inliers': int(mask.sum()),
+        'inlier_ratio': float(mask.mean()),
+        'mean_displacement_px': float(displacement.mean()),
+        'max_displacement_px': float(displacement.max()),
+    })
+    return result
+
+
+def check_drift(reference: ReferenceFeatures, video_path: str, samples: int = 5,
+                tolerance_px: float = 1.0, max_correction_px: float = 50.0, min_inliers: int = 30,
+                n_features: int = DEFAULT_FEATURES) -> dict:
+    """Compare a video against the reference and decide how to treat its calibration
+
+    ``status`` is 'ok' when the camera moved less than ``tolerance_px``
+    anywhere in the image, 'corrected' when the drift homography is
+    trustworthy (at least ``min_inliers`` RANSAC inliers) and moves no
+    point more than ``max_correction_px``, and 'recalibrate' otherwise.
+    """
+    image = background_image(sample_frames(video_path, samples))
+    result = estimate_drift(reference, image, n_features)
+    if image.shape[1::-1] != reference.image_size:
+        result['status'] = 'recalibrate'
+        result['reason'] = f"resolution {image.shape[1]}x{image.shape[0]} differs from reference"
+    elif result['homography'] is None or result['inliers'] < min_inliers:
+        result['status'] = 'recalibrate'
+        result['reason'] = f"only {result['inliers']} inlier matches"
+    elif result['max_displacement_px'] <= tolerance_px:
+        result['status'] = 'ok'
+        result['reason'] = ''
+    elif result['max_displacement_px'] <= max_correction_px:
+        result['status'] = 'corrected'
+        result['reason'] = ''
+    else:
+        result['status'] = 'recalibrate'
+        result['reason'] = f"camera moved up to {result['max_displacement_px']:.1f} px"
+    return result
+
@@ -0,0 +1,266 @@
+import argparse
+import os
+import queue
+import threading
+import time
+import cv2
+import numpy as np
+from typing import Optional, Sequence, Tuple
+from calibration_io import CalibrationTransformer, load_calibration
+from dlc_data import read_dlc_file
+from transform import check_output_path, temporary_output_path
+
+_END = object()
+
+
+class WorldCanvas:
+    """Geometry of the top-down output image in world units"""
+
+    def __init__(self, world_range: Tuple[float, float] = (0.0, 75.0), scale: float = 8.0, margin: float = 5.0):
+        self.world_min = world_range[0] - margin
+        self.world_max = world_range[1] + margin
+        self.world_range = world_range
+        self.scale = scale
+        side = int(round((self.world_max - self.world_min) * scale))
+        self.size = (side, side)
+
+    def to_canvas(self, world: np.ndarray) -> np.ndarray:
+        """World (..., 2) coordinates to output pixel coordinates"""
+        return (np.asarray(world) - self.world_min) * self.scale
+
+    def world_of_pixels(self) -> np.ndarray:
+        """World coordinates of every output pixel centre, shape (h, w, 2)"""
+        width, height = self.size
+        u, v = np.meshgrid(np.arange(width, dtype=np.float64), np.arange(height, dtype=np.float64))
+        return np.stack([u, v], axis=-1) / self.scale + self.world_min
+
+
+def build_warp_maps(calibration: CalibrationTransformer, canvas: WorldCanvas):
+    """Fixed-point remap tables from output pixels to source video pixels
+
+    Computed once per export; works for plain and lens-distortion
+    calibrations alike because it goes through world_to_pixel.
+    """
+    source = calibration.world_to_pixel(canvas.world_of_pixels()).astype(np.float32)
+    return cv2.convertMaps(source[..., 0], source[..., 1], cv2.CV_16SC2)
+
+
+def render_grid(canvas: WorldCanvas, step: float = 5.0, major: float = 25.0) -> Tuple[np.ndarray, np.ndarray]:
+    """Pre-rendered world grid layer and its mask"""
+    width, height = canvas.size
+    layer = np.zeros((height, width, 3), dtype=np.uint8)
+    lo, hi = canvas.world_range
+    ticks = np.arange(lo, hi + step / 2, step)
+    for value in ticks:
+        is_major = abs((value - lo) % major) < 1e-6 or value == hi
+        color = (200, 200, 200) if is_major else (110, 110, 110)
+        thickness = 2 if is_major else 1
+        a = canvas.to_canvas([value, lo]).round().astype(int)
+        b = canvas.to_canvas([value, hi]).round().astype(int)
+        cv2.line(layer, tuple(a), tuple(b), color, thickness)
+        a = canvas.to_canvas([lo, value]).round().astype(int)
+        b = canvas.to_canvas([hi, value]).round().astype(int)
+        cv2.line(layer, tuple(a), tuple(b), color, thickness)
+        if is_major:
+            x, y = canvas.to_canvas([value, lo]).astype(int)
+            cv2.putText(layer, f"{value:g}", (x - 8, y - 6), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
+            x, y = canvas.to_canvas([lo, value]).astype(int)
+            cv2.putText(layer, f"{value:g}", (max(x - 30, 0), y + 4), cv2.FONT_HERSHEY_SIMPLEX, 0.4,
+                        (255, 255, 255), 1)
+    mask = layer.any(axis=2)
+    return layer, mask
+
+
+def bodypart_colors(count: int):
+    """Distinct BGR colours for ``count`` bodyparts or individuals"""
+    values = np.linspace(0, 255, max(count, 1), endpoint=False).astype(np.uint8).reshape(-1, 1)
+    return [tuple(int(c) for c in row[0]) for row in cv2.applyColorMap(values, cv2.COLORMAP_HSV)]
+
+
+class _Pipeline:
+    """Decode -> warp/draw -> encode threads joined by bounded queues"""
+
+    def __init__(self, queue_size: int):
+        self.decoded = queue.Queue(maxsize=queue_size)
+        self.rendered = queue.Queue(maxsize=queue_size)
+        self.error = None
+        self.stop = threading.Event()
+        self.frames_written = 0
+
+    def put(self, q: queue.Queue, item) -> bool:
+        # Give up when another stage failed instead of blocking forever
+        while not self.stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def get(self, q: queue.Queue):
+        while not self.stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return _END
+
+    def run_stage(self, target, *args):
+        try:
+            target(*args)
+        except Exception as e:
+            self.error = e
+            self.stop.set()
+
+
+def export_rectified_video(video_path: str, calibration_path: str, output_path: str,
+                           dlc_path: Optional[str] = None, bodyparts: Optional[Sequence[str]] = None,
+                           scale: float = 8.0, trail: int = 30, likelihood_threshold: float = 0.6,
+                           queue_size: int = 16, allow_pickle: bool = False) -> int:
+    """Write a top-down world-coordinate video with grid and DLC trajectories
+
+    The video is encoded into a temporary file that replaces
+    ``output_path`` only when the export succeeds. Returns the number of
+    frames written.
+    """
+    check_output_path(video_path, output_path)
+    check_output_path(dlc_path, output_path)
+    calibration = load_calibration(calibration_path, allow_pickle=allow_pickle)
+    canvas = WorldCanvas(scale=scale)
+    map1, map2 = build_warp_maps(calibration, canvas)
+    grid_layer, grid_mask = render_grid(canvas)
+
+    tracks = None
+    colors = []
+    if dlc_path:
+        coords, individuals, all_bodyparts, _ = read_dlc_file(dlc_path)
+        if bodyparts:
+            unknown = [bp for bp in bodyparts if bp not in all_bodyparts]
+            if unknown:
+                raise ValueError(f"Unknown bodyparts: {', '.join(unknown)} (available: {', '.join(all_bodyparts)})")
+            selected = [all_bodyparts.index(bp) for bp in bodyparts]
+        else:
+            selected = list(range(len(all_bodyparts)))
+        # One track per (individual, bodypart), transformed for every frame in one pass up front
+        coords = np.asarray(coords[:, :, selected]).reshape(len(coords), -1, 3)
+        tracks = canvas.to_canvas(calibration.pixel_to_world(coords[..., :2]))
+        tracks[coords[..., 2] < likelihood_threshold] = np.nan
+        if len(individuals) > 1:
+            colors = [color for color in bodypart_colors(len(individuals)) for _ in selected]
+        else:
+            colors = bodypart_colors(len(selected))
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Cannot open video file: {video_path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    temp_path = temporary_output_path(output_path)
+    writer = cv2.VideoWriter(temp_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, canvas.size)
+    if not writer.isOpened():
+        cap.release()
+        os.remove(temp_path)
+        raise IOError(f"Cannot create output video: {output_path}")
+
+    pipeline = _Pipeline(queue_size)
+
+    def decode():
+        frame_num = 0
+        while not pipeline.stop.is_set():
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if not pipeline.put(pipeline.decoded, (frame_num, frame)):
+                return
+            frame_num += 1
+        pipeline.put(pipeline.decoded, _END)
+
+    def render():
+        while True:
+            item = pipeline.get(pipeline.decoded)
+            if item is _END:
+                break
+            frame_num, frame = item
+            out = cv2.remap(frame, map1, map2, cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT)
+            np.copyto(out, grid_layer, where=grid_mask[..., None])
+            if tracks is not None and frame_num < len(tracks):
+                start = max(frame_num - trail, 0)
+                for j, color in enumerate(colors):
+                    path = tracks[start:frame_num + 1, j]
+                    path = path[np.isfinite(path).all(axis=1)]
+                    if len(path) > 1:
+                        cv2.polylines(out, [np.round(path).astype(np.int32)], False, color, 1, cv2.LINE_AA)
+                    if len(path) and np.isfinite(tracks[frame_num, j]).all():
+                        x, y = np.round(tracks[frame_num, j]).astype(int)
+                        cv2.circle(out, (x, y), 4, color, -1)
+            cv2.putText(out, f"Frame {frame_num}", (10, out.shape[0] - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5,
+                        (255, 255, 255), 1)
+            if not pipeline.put(pipeline.rendered, out):
+                return
+        pipeline.put(pipeline.rendered, _END)
+
+    def encode():
+        while True:
+            out = pipeline.get(pipeline.rendered)
+            if out is _END:
+                break
+            writer.write(out)
+            pipeline.frames_written += 1
+
+    threads = [threading.Thread(target=pipeline.run_stage, args=(stage,), daemon=True)
+               for stage in (decode, render, encode)]
+    start_time = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    try:
+        try:
+            while threads[-1].is_alive():
+                threads[-1].join(timeout=2.0)
+                elapsed = time.perf_counter() - start_time
+                done = pipeline.frames_written
+                if threads[-1].is_alive():
+                    print(f"  Exported {done}/{total} frames ({done / max(elapsed, 1e-6):.1f} fps)", flush=True)
+        finally:
+            pipeline.stop.set()
+            for thread in threads:
+                thread.join()
+            cap.release()
+            writer.release()
+        if pipeline.error is not None:
+            raise pipeline.error
+        os.replace(temp_path, output_path)
+    finally:
+        # A failed or interrupted export never leaves a partial video
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return pipeline.frames_written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a rectified top-down video in world coordinates")
+    parser.add_argument('video', help="Source video file")
+    parser.add_argument('calibration', help="Saved calibration file")
+    parser.add_argument('--dlc', help="DeepLabCut CSV/H5 file whose trajectories are drawn")
+    parser.add_argument('-o', '--output', help="Output video (default: <video>_topdown.mp4)")
+    parser.add_argument('--bodyparts', nargs='+', help="Bodyparts to draw (default: all)")
+    parser.add_argument('--scale', type=float, default=8.0, help="Output pixels per world unit (default: 8)")
+    parser.add_argument('--trail', type=int, default=30, help="Trajectory length in frames (default: 30)")
+    parser.add_argument('--likelihood', type=float, default=0.6,
+                        help="Points below this likelihood are not drawn (default: 0.6)")
+    parser.add_argument('--allow-pickle', action='store_true',
+                        help="Allow reading legacy .pkl calibrations (only from trusted sources)")
+    args = parser.parse_args()
+    output_path = args.output or f"{os.path.splitext(args.video)[0]}_topdown.mp4"
+    start = time.perf_counter()
+    try:
+        frames = export_rectified_video(args.video, args.calibration, output_path, dlc_path=args.dlc,
+                                        bodyparts=args.bodyparts, scale=args.scale, trail=args.trail,
+                                        likelihood_threshold=args.likelihood, allow_pickle=args.allow_pickle)
+    except ValueError as e:
+        parser.error(str(e))
+    elapsed = time.perf_counter() - start
+    print(f"Exported {frames} frames to {output_path} in {elapsed:.1f}s ({frames / max(elapsed, 1e-6):.1f} fps)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import cv2
+import tkinter as tk
+import numpy as np
+
+
+class FrameCanvas:
+    """Tk canvas that displays BGR frames through a single reused PhotoImage
+
+    Frames are handed to Tk as binary PPM data, which the photo image
+    decodes natively, so no imaging library is needed. The image is only
+    recreated when the frame size changes.
+    """
+
+    def __init__(self, parent):
+        self.canvas = tk.Canvas(parent, highlightthickness=0, background='black', takefocus=True)
+        self.photo = None
+        self._item = None
+        self._rgb = None
+
+    def show(self, frame: np.ndarray):
+        height, width = frame.shape[:2]
+        if self._rgb is None or self._rgb.shape[:2] != (height, width):
+            self._rgb = np.empty((height, width, 3), dtype=np.uint8)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._rgb)
+        data = b'P6\n%d %d\n255\n' % (width, height) + self._rgb.tobytes()
+        if self.photo is None or (self.photo.width(), self.photo.height()) != (width, height):
+            self.photo = tk.PhotoImage(master=self.canvas, data=data, format='PPM')
+            self.canvas.config(width=width, height=height)
+            if self._item is None:
+                self._item = self.canvas.create_image(0, 0, anchor='nw', image=self.photo)
+            else:
+                self.canvas.itemconfig(self._item, image=self.photo)
+        else:
+            self.photo.configure(data=data, format='PPM')
@@ -0,0 +1,277 @@
+import atexit
+import cv2
+import queue
+import threading
+import time
+import numpy as np
+from collections import OrderedDict
+from typing import Optional, Tuple
+from seek_index import SeekIndex
+
+
+class FrameCache:
+    """Thread-safe LRU cache of decoded frames bounded by total bytes"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._frames = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, frame_num: int) -> Optional[np.ndarray]:
+        with self._lock:
+            frame = self._frames.get(frame_num)
+            if frame is not None:
+                self._frames.move_to_end(frame_num)
+            return frame
+
+    def __contains__(self, frame_num: int) -> bool:
+        with self._lock:
+            return frame_num in self._frames
+
+    def put(self, frame_num: int, frame: np.ndarray):
+        with self._lock:
+            old = self._frames.pop(frame_num, None)
+            if old is not None:
+                self.nbytes -= old.nbytes
+            self._frames[frame_num] = frame
+            self.nbytes += frame.nbytes
+            while self.nbytes > self.max_bytes and len(self._frames) > 1:
+                _, evicted = self._frames.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self.nbytes = 0
+
+
+class FrameSource:
+    """Random-access frame reader with an LRU cache and a prefetch thread
+
+    The prefetch thread keeps a window of decoded frames around the current
+    position (``prefetch_behind`` frames before it, ``prefetch_ahead`` after)
+    so that playback and A/D stepping are served from memory. Frames are
+    decoded sequentially inside the window, so stepping backward costs one
+    keyframe seek per window instead of one per frame.
+
+    With a ``SeekIndex`` seeks start from the preceding keyframe and are
+    checked against the frame timestamps, so the returned frame is exactly
+    the requested one even on variable-frame-rate files.
+
+    Returned frames are shared with the cache and marked read-only.
+    """
+
+    def __init__(self, video_path: str, cache_bytes: int = 512 * 1024 * 1024,
+                 prefetch_ahead: int = 30, prefetch_behind: int = 30,
+                 seek_index: Optional[SeekIndex] = None):
+        self.video_path = video_path
+        self.cap = cv2.VideoCapture(video_path)
+        self.seek_index = seek_index
+        self.cache = FrameCache(cache_bytes)
+        self.prefetch_ahead = prefetch_ahead
+        self.prefetch_behind = prefetch_behind
+        self.frame_count = 0
+        self.fps = 30
+        self.frame_size = (0, 0)
+        self._cap_lock = threading.Lock()
+        self._next_read = 0
+        self._unreadable = set()
+        self._position = 0
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread = None
+        if self.cap.isOpened():
+            if seek_index is not None:
+                self.frame_count = seek_index.frame_count
+            else:
+                self.frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+            self.frame_size = (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                               int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+            self._thread = threading.Thread(target=self._prefetch_loop, daemon=True)
+            self._thread.start()
+            # The decoder must not be torn down while the thread is inside it
+            atexit.register(self.close)
+
+    def is_opened(self) -> bool:
+        return self.cap.isOpened()
+
+    def get(self, frame_num: int) -> Optional[np.ndarray]:
+        """Return the decoded frame, from cache when possible"""
+        self.set_position(frame_num)
+        frame = self.cache.get(frame_num)
+        if frame is None:
+            frame = self._decode(frame_num)
+        return frame
+
+    def set_position(self, frame_num: int):
+        """Move the prefetch window to centre on ``frame_num``"""
+        self._position = frame_num
+        self._wake.set()
+
+    def close(self):
+        atexit.unregister(self.close)
+        self._stopped = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        with self._cap_lock:
+            self.cap.release()
+        self.cache.clear()
+
+    def _decode(self, frame_num: int) -> Optional[np.ndarray]:
+        with self._cap_lock:
+            frame = self.cache.get(frame_num)
+            if frame is not None:
+                return frame
+            if self._stopped or frame_num < 0 or frame_num in self._unreadable:
+                return None
+            if self.frame_count and frame_num >= self.frame_count:
+                return None
+            if frame_num == self._next_read:
+                ret, frame = self.cap.read()
+            elif self._can_grab_forward(frame_num):
+                # Fast playback skips frames; grabbing past them without
+                # conversion is cheaper than seeking back to a keyframe
+                ret = True
+                while ret and self._next_read < frame_num:
+                    ret = self.cap.grab()
+                    self._next_read += 1
+                frame = None
+                if ret:
+                    ret, frame = self.cap.read()
+            else:
+                ret, frame = self._seek_read(frame_num)
+            if not ret:
+                self._next_read = -1
+                self._unreadable.add(frame_num)
+                return None
+            self._next_read = frame_num + 1
+        frame.flags.writeable = False
+        self.cache.put(frame_num, frame)
+        return frame
+
+    def _can_grab_forward(self, frame_num: int) -> bool:
+        if self._next_read < 0 or frame_num < self._next_read:
+            return False
+        if self.seek_index is not None:
+            # No keyframe in between: a seek would decode the same frames
+            return self.seek_index.keyframe_before(frame_num) <= self._next_read
+        return frame_num - self._next_read <= self.prefetch_ahead
+
+    def _seek_read(self, frame_num: int):
+        if self.seek_index is None:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_num)
+            return self.cap.read()
+        anchor = self.seek_index.keyframe_before(frame_num)
+        for _ in range(4):
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, anchor)
+            ret, frame = self.cap.read()
+            if not ret:
+                return ret, frame
+            actual = self.seek_index.frame_at_time(self.cap.get(cv2.CAP_PROP_POS_MSEC))
+            if actual <= frame_num or anchor == 0:
+                break
+            # The container seek overshot; retry from an earlier keyframe
+            anchor = self.seek_index.keyframe_before(anchor - max(actual - frame_num, 1))
+        else:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+            actual = 0
+        while ret and actual < frame_num:
+            if actual + 1 < frame_num:
+                ret = self.cap.grab()
+            else:
+                ret, frame = self.cap.read()
+            actual += 1
+        return ret, frame
+
+    def _window_limits(self, position: int, frame_nbytes: int):
+        # Never prefetch more than the cache can hold, or the window would
+        # evict its own frames before they are displayed
+        capacity = max(self.cache.max_bytes // max(frame_nbytes, 1) - 1, 0)
+        ahead = min(self.prefetch_ahead, capacity // 2)
+        behind = min(self.prefetch_behind, capacity - ahead)
+        last = self.frame_count - 1 if self.frame_count > 0 else position + ahead
+        return max(position - behind, 0), min(position + ahead, last)
+
+    def _next_missing(self, position: int, frame_nbytes: int) -> Optional[int]:
+        first, last = self._window_limits(position, frame_nbytes)
+        for frame_num in range(position, last + 1):
+            if frame_num not in self.cache and frame_num not in self._unreadable:
+                return frame_num
+        # Fill the part behind the position from its start so decoding stays
+        # sequential after a single seek
+        for frame_num in range(first, position):
+            if frame_num not in self.cache and frame_num not in self._unreadable:
+                return frame_num
+        return None
+
+    def _prefetch_loop(self):
+        frame_nbytes = 0
+        while not self._stopped:
+            self._wake.clear()
+            frame_num = self._next_missing(self._position, frame_nbytes)
+            if frame_num is None:
+                self._wake.wait()
+                continue
+            frame = self._decode(frame_num)
+            if frame is not None:
+                frame_nbytes = frame.nbytes
+
+
+class DecodeWorker:
+    """Fetches requested frames of a FrameSource on a background thread
+
+    The UI thread calls request() and later poll(), neither of which
+    blocks, so seeks and decodes never stall event handling. Only the
+    most recent request is pending at any time: stepping quickly through
+    frames does not queue up decodes of frames that will never be shown.
+    """
+
+    def __init__(self, source: FrameSource):
+        self.source = source
+        self._results = queue.Queue()
+        self._condition = threading.Condition()
+        self._request = None
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def request(self, frame_num: int):
+        """Ask for ``frame_num``, replacing any request not yet started"""
+        with self._condition:
+            self._request = (frame_num, time.perf_counter())
+            self._condition.notify()
+
+    def poll(self) -> Optional[Tuple[int, Optional[np.ndarray], float]]:
+        """Most recent finished (frame_num, frame, latency_ms), or None
+
+        ``frame`` is None when the frame cannot be read; ``latency_ms`` is
+        the time from request to completion.
+        """
+        result = None
+        while True:
+            try:
+                result = self._results.get_nowait()
+            except queue.Empty:
+                return result
+
+    def close(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        self._thread.join(timeout=1.0)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._request is None and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                frame_num, requested = self._request
+                self._request = None
+            frame = self.source.get(frame_num)
+            self._results.put((frame_num, frame, (time.perf_counter() - requested) * 1000.0))
@@ -0,0 +1,60 @@
+import numpy as np
+
+
+def frame_jitter(coords: np.ndarray) -> np.ndarray:
+    """Largest displacement (px) of a point to its previous or next frame
+
+    ``coords`` is an (n, 2+) array of x, y per frame. The first and last
+    frames, and frames next to missing points, get infinite jitter.
+    """
+    xy = np.asarray(coords[:, :2], dtype=np.float64)
+    step = np.full(len(xy) + 1, np.inf)
+    if len(xy) > 1:
+        step[1:-1] = np.linalg.norm(np.diff(xy, axis=0), axis=1)
+    step[~np.isfinite(step)] = np.inf
+    return np.maximum(step[:-1], step[1:])
+
+
+def farthest_point_order(points: np.ndarray, count: int, start: int) -> np.ndarray:
+    """Indices of ``count`` points chosen greedily to be far from each other"""
+    count = min(count, len(points))
+    order = np.empty(count, dtype=np.intp)
+    order[0] = start
+    distance = np.linalg.norm(points - points[start], axis=1)
+    for i in range(1, count):
+        order[i] = int(np.argmax(distance))
+        distance = np.minimum(distance, np.linalg.norm(points - points[order[i]], axis=1))
+    return order
+
+
+def suggest_calibration_frames(coords: np.ndarray, num_frames: int = 12, likelihood_threshold: float = 0.9,
+                               jitter_threshold: float = 2.0, grid_size: int = 8) -> np.ndarray:
+    """Rank frames that make good calibration points for one bodypart
+
+    ``coords`` is the (frames, 3) x/y/likelihood array of the bodypart.
+    Frames with low likelihood or a point that moves more than
+    ``jitter_threshold`` pixels to a neighbouring frame are discarded. The
+    remaining frames are binned on a ``grid_size`` x ``grid_size`` grid
+    over the area the bodypart visits, keeping the steadiest, most
+    confident frame per cell, and cells are then picked by farthest-point
+    sampling so the first suggestions already span the image.
+    """
+    coords = np.asarray(coords)
+    likelihood = coords[:, 2]
+    jitter = frame_jitter(coords)
+    candidates = np.flatnonzero((likelihood >= likelihood_threshold) & (jitter <= jitter_threshold))
+    if len(candidates) == 0:
+        return candidates
+    xy = coords[candidates, :2].astype(np.float64)
+    lo = xy.min(axis=0)
+    span = np.maximum(xy.max(axis=0) - lo, 1e-6)
+    cells = np.minimum(((xy - lo) / span * grid_size).astype(np.intp), grid_size - 1)
+    cell_id = cells[:, 1] * grid_size + cells[:, 0]
+    # Best frame per cell: sort by cell, then jitter, then descending likelihood
+    order = np.lexsort((-likelihood[candidates], jitter[candidates], cell_id))
+    _, first = np.unique(cell_id[order], return_index=True)
+    best = order[first]
+    points = xy[best]
+    start = int(np.argmax(np.linalg.norm(points - points.mean(axis=0), axis=1)))
+    ranked = farthest_point_order(points, num_frames, start)
+    return candidates[best[ranked]]
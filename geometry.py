@@ -0,0 +1,13 @@
+import numpy as np
+
+
+def apply_homography(H: np.ndarray, points: np.ndarray) -> np.ndarray:
+    """Map an (..., 2) array of points through a homography"""
+    points = np.asarray(points, dtype=np.float64)
+    x = points[..., 0]
+    y = points[..., 1]
+    w = H[2, 0] * x + H[2, 1] * y + H[2, 2]
+    out = np.empty(points.shape, dtype=np.float64)
+    out[..., 0] = (H[0, 0] * x + H[0, 1] * y + H[0, 2]) / w
+    out[..., 1] = (H[1, 0] * x + H[1, 1] * y + H[1, 2]) / w
+    return out
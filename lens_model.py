@@ -0,0 +1,146 @@
+import numpy as np
+from typing import Tuple
+from geometry import apply_homography
+from diagnostics import fit_homographies
+
+
+class DivisionDistortion:
+    """One-parameter division model of radial lens distortion
+
+    An observed pixel ``p`` maps to the undistorted pixel
+    ``c + (p - c) / (1 + k1 * r**2)``, where ``r`` is the distance to the
+    image centre ``c`` divided by the half-diagonal. Negative ``k1``
+    corrects barrel distortion. The model is exact to invert in the
+    undistort direction, which is the one bulk conversion needs.
+    """
+
+    def __init__(self, k1: float, image_size: Tuple[int, int]):
+        self.k1 = float(k1)
+        self.image_size = (int(image_size[0]), int(image_size[1]))
+        width, height = self.image_size
+        self.center = np.array([(width - 1) / 2.0, (height - 1) / 2.0])
+        self.norm = float(np.hypot(width, height) / 2.0)
+
+    def undistort(self, points: np.ndarray) -> np.ndarray:
+        """Map observed (..., 2) pixel points to undistorted pixel points"""
+        offset = (np.asarray(points, dtype=np.float64) - self.center) / self.norm
+        r2 = np.sum(offset * offset, axis=-1, keepdims=True)
+        return self.center + offset / (1.0 + self.k1 * r2) * self.norm
+
+    def distort(self, points: np.ndarray) -> np.ndarray:
+        """Map undistorted (..., 2) pixel points back to observed pixel points
+
+        Solves k1 * r_u * r_d**2 - r_d + r_u = 0 for the root that tends to
+        r_d = r_u as k1 -> 0. Points with no observed preimage (beyond the
+        fold of a pincushion model) are NaN.
+        """
+        undistorted = (np.asarray(points, dtype=np.float64) - self.center) / self.norm
+        r2 = np.sum(undistorted * undistorted, axis=-1, keepdims=True)
+        with np.errstate(invalid='ignore'):
+            # r_d / r_u = 2 / (1 + sqrt(1 - 4 k1 r_u^2)), stable for either sign of k1
+            scale = 2.0 / (1.0 + np.sqrt(1.0 - 4.0 * self.k1 * r2))
+        return self.center + undistorted * scale * self.norm
+
+    def to_dict(self) -> dict:
+        return {'model': 'division', 'k1': self.k1, 'image_size': list(self.image_size)}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'DivisionDistortion':
+        return cls(data['k1'], data['image_size'])
+
+
+def estimate_distortion(pixel: np.ndarray, world: np.ndarray, image_size: Tuple[int, int],
+                        k_range: Tuple[float, float] = (-0.6, 0.6), steps: int = 121,
+                        refinements: int = 3) -> Tuple[DivisionDistortion, np.ndarray]:
+    """Estimate k1 together with the homography from calibration points
+
+    Every candidate k1 of a grid is evaluated at once: the points are
+    undistorted for all candidates, a homography is fitted per candidate
+    in one batched solve, and the candidate with the lowest RMS world
+    error is kept. The grid is then narrowed around the best value.
+    Needs at least six points. Returns the distortion model and the
+    homography from undistorted pixels to world coordinates.
+    """
+    pixel = np.asarray(pixel, dtype=np.float64).reshape(-1, 2)
+    world = np.asarray(world, dtype=np.float64).reshape(-1, 2)
+    if len(pixel) < 6:
+        raise ValueError("At least 6 calibration points are needed to estimate lens distortion")
+    model = DivisionDistortion(0.0, image_size)
+    offset = (pixel - model.center) / model.norm
+    r2 = np.sum(offset * offset, axis=-1, keepdims=True)
+    lo, hi = k_range
+    best_k = 0.0
+    for _ in range(refinements + 1):
+        candidates = np.linspace(lo, hi, steps)
+        undistorted = model.center + offset / (1.0 + candidates[:, None, None] * r2) * model.norm
+        H = fit_homographies(undistorted, np.broadcast_to(world, undistorted.shape))
+        x, y = undistorted[..., 0], undistorted[..., 1]
+        w = H[:, 2, 0, None] * x + H[:, 2, 1, None] * y + H[:, 2, 2, None]
+        mapped_x = (H[:, 0, 0, None] * x + H[:, 0, 1, None] * y + H[:, 0, 2, None]) / w
+        mapped_y = (H[:, 1, 0, None] * x + H[:, 1, 1, None] * y + H[:, 1, 2, None]) / w
+        rms = np.sqrt(np.mean((mapped_x - world[:, 0]) ** 2 + (mapped_y - world[:, 1]) ** 2, axis=1))
+        rms[~np.isfinite(rms)] = np.inf
+        best = int(np.argmin(rms))
+        best_k = candidates[best]
+        step = (hi - lo) / (steps - 1)
+        lo, hi = best_k - 2 * step, best_k + 2 * step
+    model = DivisionDistortion(best_k, image_size)
+    H = fit_homographies(model.undistort(pixel), world)
+    return model, H
+
+
+class PixelLookupTable:
+    """Dense pixel-to-world grid sampled every ``step`` pixels
+
+    World coordinates between grid nodes are bilinearly interpolated, so
+    converting any number of points is a vectorized table lookup
+    regardless of how expensive the underlying mapping is. Points outside
+    the image map to NaN.
+    """
+
+    def __init__(self, table: np.ndarray, step: int):
+        self.table = np.ascontiguousarray(table, dtype=np.float32)
+        self.step = int(step)
+
+    @classmethod
+    def build(cls, H: np.ndarray, image_size: Tuple[int, int], distortion: DivisionDistortion = None,
+              step: int = 4) -> 'PixelLookupTable':
+        width, height = image_size
+        # One node past the last pixel so every in-image point has four neighbours
+        xs = np.arange(0, width - 1 + step, step, dtype=np.float64)
+        ys = np.arange(0, height - 1 + step, step, dtype=np.float64)
+        grid = np.stack(np.meshgrid(xs, ys), axis=-1)
+        if distortion is not None:
+            grid = distortion.undistort(grid)
+        return cls(apply_homography(H, grid), step)
+
+    def lookup(self, points: np.ndarray) -> np.ndarray:
+        """Convert an (..., 2) array of pixel points to world coordinates"""
+        points = np.asarray(points, dtype=np.float64)
+        flat = points.reshape(-1, 2)
+        rows, cols = self.table.shape[:2]
+        gx = flat[:, 0] * (1.0 / self.step)
+        gy = flat[:, 1] * (1.0 / self.step)
+        with np.errstate(invalid='ignore'):
+            inside = (gx >= 0) & (gy >= 0) & (gx <= cols - 1) & (gy <= rows - 1)
+        # NaN cannot be cast to an index; look up node 0 and mask afterwards
+        gx = np.where(inside, gx, 0.0)
+        gy = np.where(inside, gy, 0.0)
+        x0 = np.minimum(gx, cols - 2).astype(np.intp)
+        y0 = np.minimum(gy, rows - 2).astype(np.intp)
+        fx = (gx - x0).astype(np.float32)
+        fy = (gy - y0).astype(np.float32)
+        # Viewing each (x, y) node as one complex64 gathers and blends both
+        # channels with a single operation per neighbour
+        table = self.table.view(np.complex64).reshape(-1)
+        i = y0 * cols + x0
+        top_left = table.take(i)
+        bottom_left = table.take(i + cols)
+        top = top_left + (table.take(i + 1) - top_left) * fx
+        bottom = bottom_left + (table.take(i + cols + 1) - bottom_left) * fx
+        world = top + (bottom - top) * fy
+        world[~inside] = complex(np.nan, np.nan)
+        out = np.empty(points.shape, dtype=np.float64)
+        out.reshape(-1, 2)[:, 0] = world.real
+        out.reshape(-1, 2)[:, 1] = world.imag
+        return out
@@ -18,8 +18,8 @@ def main():
     calibrator = InteractiveCalibrationTool()
 
     csv_path = filedialog.askopenfilename(
-        title="Select DeepLabCut CSV file",
-        filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
+        title="Select DeepLabCut CSV or H5 file",
+        filetypes=[("DeepLabCut files", "*.csv *.h5"), ("CSV files", "*.csv"), ("H5 files", "*.h5"), ("All files", "*.*")]
     )
     if not csv_path or not calibrator.load_csv(csv_path):
         root.destroy()
@@ -39,15 +39,19 @@ def main():
 
     root.withdraw()
     if calibrator.run_calibration(root):
-        H = calibrator.calculate_homography()
+        root.deiconify()
+        estimate_distortion = len(calibrator.calibration_points) >= 6 and messagebox.askyesno(
+            "Lens Distortion",
+            "Estimate lens distortion together with the homography?\n(Recommended for wide-angle cameras)",
+            parent=root)
+        H = calibrator.calculate_homography(estimate_distortion=estimate_distortion)
         if H is not None:
-            root.deiconify()
             save = messagebox.askyesno("Save Calibration", "Do you want to save the calibration data?", parent=root)
             if save:
                 save_path = filedialog.asksaveasfilename(
                     title="Save calibration data",
-                    defaultextension=".pkl",
-                    filetypes=[("Pickle files", "*.pkl"), ("All files", "*.*")]
+                    defaultextension=".npz",
+                    filetypes=[("Calibration files", "*.npz"), ("All files", "*.*")]
                 )
                 if save_path:
                     calibrator.save_calibration_data(save_path, H)
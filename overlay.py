@@ -0,0 +1,133 @@
+import cv2
+import numpy as np
+from typing import Callable, Hashable, List, Optional, Tuple
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+
+class Sprite:
+    """Small pre-rendered image with an alpha mask at a fixed frame position
+
+    ``image`` is premultiplied by ``alpha``, which is what drawing onto a
+    black canvas produces, including OpenCV's antialiased text edges.
+    """
+
+    def __init__(self, x: int, y: int, image: np.ndarray, alpha: np.ndarray):
+        self.x = x
+        self.y = y
+        self.image = image
+        self.inverse_alpha = cv2.merge([255 - alpha] * 3)
+
+    @classmethod
+    def render(cls, x: int, y: int, width: int, height: int,
+               draw: Callable[[np.ndarray, np.ndarray], None]) -> 'Sprite':
+        """Render ``draw(canvas, alpha)`` on a transparent canvas covering the given box
+
+        ``draw`` paints every primitive twice: in colour on ``canvas`` and in
+        255 on the single-channel ``alpha``, both in canvas coordinates,
+        i.e. frame coordinates minus (x, y).
+        """
+        canvas = np.zeros((height, width, 3), dtype=np.uint8)
+        alpha = np.zeros((height, width), dtype=np.uint8)
+        draw(canvas, alpha)
+        return cls(x, y, canvas, alpha)
+
+    def composite(self, out: np.ndarray):
+        """Alpha-blend the sprite into ``out``, clipped to its bounds"""
+        height, width = self.image.shape[:2]
+        x0, y0 = max(self.x, 0), max(self.y, 0)
+        x1, y1 = min(self.x + width, out.shape[1]), min(self.y + height, out.shape[0])
+        if x0 >= x1 or y0 >= y1:
+            return
+        sx, sy = x0 - self.x, y0 - self.y
+        region = (slice(sy, sy + y1 - y0), slice(sx, sx + x1 - x0))
+        target = out[y0:y1, x0:x1]
+        # out = out * (255 - alpha) / 255 + premultiplied image, in place
+        cv2.multiply(target, self.inverse_alpha[region], dst=target, scale=1.0 / 255)
+        cv2.add(target, self.image[region], dst=target)
+
+
+def text_sprite(text: str, org: Tuple[int, int], scale: float, color, thickness: int = 1) -> Sprite:
+    """Sprite of a cv2.putText line with its baseline origin at ``org``"""
+    (width, height), baseline = cv2.getTextSize(text, FONT, scale, thickness)
+    pad = thickness + 1
+    x, y = org[0] - pad, org[1] - height - pad
+    box_height = height + baseline + 2 * pad
+
+    def draw(canvas, alpha):
+        for target, value in ((canvas, color), (alpha, 255)):
+            cv2.putText(target, text, (pad, height + pad), FONT, scale, value, thickness)
+    return Sprite.render(x, y, width + 2 * pad, box_height, draw)
+
+
+def marker_sprite(center: Tuple[int, int], radius: int, thickness: int, color,
+                  label: str, label_color, label_scale: float = 0.4) -> Sprite:
+    """Sprite of a ring with a centre dot and a label to its upper right"""
+    (text_width, text_height), baseline = cv2.getTextSize(label, FONT, label_scale, 1)
+    reach = radius + thickness
+    left = center[0] - reach
+    top = min(center[1] - reach, center[1] - 8 - text_height - 2)
+    width = max(2 * reach + 1, reach + 12 + text_width + 2)
+    height = max(center[1] + reach, center[1] - 8 + baseline + 1) - top + 1
+
+    def draw(canvas, alpha):
+        local = (center[0] - left, center[1] - top)
+        for target, ring, text in ((canvas, color, label_color), (alpha, 255, 255)):
+            cv2.circle(target, local, radius, ring, thickness)
+            cv2.circle(target, local, 2, ring, -1)
+            cv2.putText(target, label, (local[0] + 12, local[1] - 8), FONT, label_scale, text, 1)
+    return Sprite.render(left, top, width, height, draw)
+
+
+class OverlayLayer:
+    """Cached sprites that are rebuilt only when the layer key changes"""
+
+    _UNSET = object()
+
+    def __init__(self, build: Callable[[Tuple[int, int]], List[Sprite]]):
+        self.build = build
+        self.key = self._UNSET
+        self.sprites: List[Sprite] = []
+
+    def invalidate(self):
+        self.key = self._UNSET
+
+    def composite(self, out: np.ndarray, key: Hashable):
+        if key != self.key:
+            self.sprites = self.build(out.shape[:2])
+            self.key = key
+        for sprite in self.sprites:
+            sprite.composite(out)
+
+
+class OverlayCompositor:
+    """Composites cached overlay layers onto frames in a reused output buffer
+
+    Each frame is copied once into the buffer and every layer blends its
+    sprites into their own small regions, so steady-state rendering
+    allocates nothing and redraws nothing. The returned buffer is overwritten by the
+    next call to begin().
+    """
+
+    def __init__(self):
+        self.layers = {}
+        self._buffer: Optional[np.ndarray] = None
+
+    def add_layer(self, name: str, build: Callable[[Tuple[int, int]], List[Sprite]]):
+        self.layers[name] = OverlayLayer(build)
+
+    def invalidate(self):
+        for layer in self.layers.values():
+            layer.invalidate()
+
+    def begin(self, frame: np.ndarray) -> np.ndarray:
+        """Copy ``frame`` into the output buffer and return the buffer"""
+        if self._buffer is None or self._buffer.shape != frame.shape or self._buffer.dtype != frame.dtype:
+            self._buffer = np.empty_like(frame)
+            # Layer positions depend on the frame size
+            self.invalidate()
+        np.copyto(self._buffer, frame)
+        return self._buffer
+
+    def composite(self, name: str, key: Hashable, out: np.ndarray):
+        self.layers[name].composite(out, key)
@@ -0,0 +1,59 @@
+import time
+import numpy as np
+from typing import Optional
+
+MIN_SPEED = 0.25
+MAX_SPEED = 8.0
+
+
+class PlaybackClock:
+    """Maps wall-clock time to video frames for real-time paced playback
+
+    Frames are scheduled from their presentation timestamps (from the
+    ``SeekIndex`` when available, otherwise from the nominal fps), so
+    variable-frame-rate files play at their true speed. When drawing falls
+    behind, due_frame() jumps past the frames whose time has already gone
+    instead of slowing playback down.
+    """
+
+    def __init__(self, timestamps_ms: Optional[np.ndarray], fps: float, frame_count: int):
+        if timestamps_ms is None or len(timestamps_ms) == 0:
+            timestamps_ms = np.arange(max(frame_count, 1)) * (1000.0 / (fps or 30))
+        self.timestamps_ms = np.asarray(timestamps_ms, dtype=np.float64)
+        if len(self.timestamps_ms) > 1:
+            self.frame_interval_ms = float(np.median(np.diff(self.timestamps_ms)))
+        else:
+            self.frame_interval_ms = 1000.0 / (fps or 30)
+        self.speed = 1.0
+        self._origin_media = 0.0
+        self._origin_wall = time.perf_counter()
+
+    def start(self, frame_num: int):
+        """Anchor the clock so that ``frame_num`` is due now"""
+        frame_num = min(max(frame_num, 0), len(self.timestamps_ms) - 1)
+        self._origin_media = self.timestamps_ms[frame_num]
+        self._origin_wall = time.perf_counter()
+
+    def media_time(self) -> float:
+        """Current playback position in video milliseconds"""
+        return self._origin_media + (time.perf_counter() - self._origin_wall) * 1000.0 * self.speed
+
+    def set_speed(self, speed: float) -> float:
+        """Change the speed without jumping; returns the clamped speed"""
+        now = self.media_time()
+        self.speed = float(min(max(speed, MIN_SPEED), MAX_SPEED))
+        self._origin_media = now
+        self._origin_wall = time.perf_counter()
+        return self.speed
+
+    def due_frame(self) -> int:
+        """Last frame whose timestamp has been reached"""
+        return int(np.searchsorted(self.timestamps_ms, self.media_time(), side='right')) - 1
+
+    def delay_ms(self, frame_num: int) -> float:
+        """Wall-clock milliseconds until ``frame_num`` is due (negative when late)"""
+        if frame_num >= len(self.timestamps_ms):
+            frame_time = self.timestamps_ms[-1] + self.frame_interval_ms
+        else:
+            frame_time = self.timestamps_ms[max(frame_num, 0)]
+        return (frame_time - self.media_time()) / self.speed
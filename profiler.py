@@ -0,0 +1,155 @@
+import bisect
+import csv
+import json
+import time
+import numpy as np
+from collections import deque
+from typing import Dict, List
+
+# Histogram bin edges in milliseconds, log-spaced from 10 us to 10 s
+HISTOGRAM_EDGES_MS = np.concatenate([[0.0], np.logspace(-2, 4, 61)])
+_EDGES = HISTOGRAM_EDGES_MS.tolist()
+
+
+class _NullStage:
+    """Shared no-op context manager handed out while profiling is disabled"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    """Timer for one named stage, reused for every measurement of that stage"""
+
+    __slots__ = ('stats', '_start')
+
+    def __init__(self, stats: 'StageStats'):
+        self.stats = stats
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats.add((time.perf_counter() - self._start) * 1000.0)
+        return False
+
+
+class StageStats:
+    """Rolling window and session-wide histogram of one stage's durations"""
+
+    def __init__(self, window: int):
+        self.recent = deque(maxlen=window)
+        self.counts = np.zeros(len(HISTOGRAM_EDGES_MS), dtype=np.int64)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms: float):
+        self.recent.append(ms)
+        self.counts[bisect.bisect_right(_EDGES, ms) - 1] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def summary(self) -> dict:
+        recent = np.fromiter(self.recent, dtype=np.float64, count=len(self.recent))
+        return {
+            'count': self.count,
+            'total_ms': self.total_ms,
+            'mean_ms': self.total_ms / self.count if self.count else None,
+            'max_ms': self.max_ms,
+            'recent_mean_ms': float(recent.mean()) if len(recent) else None,
+            'recent_p50_ms': float(np.percentile(recent, 50)) if len(recent) else None,
+            'recent_p95_ms': float(np.percentile(recent, 95)) if len(recent) else None,
+        }
+
+
+class StageProfiler:
+    """Wall-clock timers around the stages of the interactive loop
+
+    Use ``with profiler.stage('decode'): ...``. While disabled, stage()
+    returns a shared no-op context manager, so instrumented code costs one
+    attribute check per stage. Each stage keeps its last ``window``
+    durations for live statistics and a log-binned histogram over the
+    whole session for export.
+    """
+
+    def __init__(self, enabled: bool = False, window: int = 120):
+        self.enabled = enabled
+        self.window = window
+        self.stages: Dict[str, StageStats] = {}
+        self._timers: Dict[str, _Stage] = {}
+        self._ticks = deque(maxlen=window + 1)
+
+    def stage(self, name: str):
+        if not self.enabled:
+            return _NULL_STAGE
+        timer = self._timers.get(name)
+        if timer is None:
+            stats = self.stages[name] = StageStats(self.window)
+            timer = self._timers[name] = _Stage(stats)
+        return timer
+
+    def record(self, name: str, ms: float):
+        """Add a duration measured elsewhere, e.g. on a worker thread"""
+        if self.enabled:
+            self.stage(name).stats.add(ms)
+
+    def tick(self):
+        """Mark the end of a displayed frame, for the achieved frame rate"""
+        if self.enabled:
+            self._ticks.append(time.perf_counter())
+
+    def fps(self) -> float:
+        if len(self._ticks) < 2:
+            return float('nan')
+        return (len(self._ticks) - 1) / max(self._ticks[-1] - self._ticks[0], 1e-9)
+
+    def has_data(self) -> bool:
+        return any(stats.count for stats in self.stages.values())
+
+    def overlay_lines(self) -> List[str]:
+        """Achieved FPS and the recent mean of every stage, for drawing on the frame"""
+        lines = [f"FPS: {self.fps():.1f}"]
+        for name, stats in self.stages.items():
+            if stats.recent:
+                lines.append(f"{name}: {sum(stats.recent) / len(stats.recent):.2f} ms")
+        return lines
+
+    def report(self) -> dict:
+        return {
+            'fps': self.fps() if len(self._ticks) > 1 else None,
+            'histogram_edges_ms': HISTOGRAM_EDGES_MS.tolist(),
+            'stages': {name: dict(stats.summary(), histogram=stats.counts.tolist())
+                       for name, stats in self.stages.items()},
+        }
+
+    def export(self, path: str):
+        """Write the session histograms as JSON, or as CSV when ``path`` ends in .csv
+
+        The CSV has one row per non-empty histogram bin of every stage.
+        """
+        if path.lower().endswith('.csv'):
+            upper = np.append(HISTOGRAM_EDGES_MS[1:], np.inf)
+            with open(path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['stage', 'bin_low_ms', 'bin_high_ms', 'count', 'stage_mean_ms', 'stage_max_ms'])
+                for name, stats in self.stages.items():
+                    summary = stats.summary()
+                    for i in np.flatnonzero(stats.counts):
+                        writer.writerow([name, HISTOGRAM_EDGES_MS[i], upper[i], int(stats.counts[i]),
+                                         round(summary['mean_ms'], 4), round(summary['max_ms'], 4)])
+        else:
+            with open(path, 'w') as f:
+                json.dump(self.report(), f, indent=2)
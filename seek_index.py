@@ -0,0 +1,114 @@
+import os
+import cv2
+import numpy as np
+from typing import Optional
+
+SEEK_INDEX_VERSION = 1
+SIDECAR_SUFFIX = '.seekidx.npz'
+
+
+def sidecar_path(video_path: str) -> str:
+    """Path of the seek index stored next to a video"""
+    return video_path + SIDECAR_SUFFIX
+
+
+def _video_signature(video_path: str) -> np.ndarray:
+    stat = os.stat(video_path)
+    return np.array([SEEK_INDEX_VERSION, stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+
+class SeekIndex:
+    """Keyframe positions and presentation timestamps of every video frame
+
+    Frame numbers are positions in presentation order, which is the order of
+    the rows in the DeepLabCut CSV.
+    """
+
+    def __init__(self, timestamps_ms: np.ndarray, keyframes: np.ndarray):
+        self.timestamps_ms = np.asarray(timestamps_ms, dtype=np.float64)
+        self.keyframes = np.asarray(keyframes, dtype=np.int64)
+
+    @property
+    def frame_count(self) -> int:
+        return len(self.timestamps_ms)
+
+    def keyframe_before(self, frame_num: int) -> int:
+        """Closest keyframe at or before ``frame_num``"""
+        if frame_num <= 0 or len(self.keyframes) == 0:
+            return 0
+        i = np.searchsorted(self.keyframes, frame_num, side='right') - 1
+        return int(self.keyframes[i]) if i >= 0 else 0
+
+    def frame_at_time(self, timestamp_ms: float) -> int:
+        """Frame whose timestamp is closest to ``timestamp_ms``"""
+        ts = self.timestamps_ms
+        i = int(np.searchsorted(ts, timestamp_ms))
+        if i >= len(ts):
+            return len(ts) - 1
+        if i > 0 and timestamp_ms - ts[i - 1] < ts[i] - timestamp_ms:
+            return i - 1
+        return i
+
+    @classmethod
+    def build(cls, video_path: str) -> Optional['SeekIndex']:
+        """Scan the video once, reading packets without decoding them"""
+        cap = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG)
+        if not cap.isOpened():
+            return None
+        raw_mode = cap.set(cv2.CAP_PROP_FORMAT, -1)
+        expected = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        timestamps = []
+        key_timestamps = []
+        while cap.grab():
+            ts = cap.get(cv2.CAP_PROP_POS_MSEC)
+            timestamps.append(ts)
+            if raw_mode and cap.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME):
+                key_timestamps.append(ts)
+            if expected > 0 and len(timestamps) % 10000 == 0:
+                print(f"  Indexing video: {len(timestamps)}/{expected} frames")
+        cap.release()
+        if not timestamps:
+            return None
+        # Packets arrive in decode order; sorting the timestamps gives
+        # presentation order when the stream has B-frames
+        timestamps = np.sort(np.array(timestamps, dtype=np.float64))
+        if raw_mode:
+            keyframes = np.searchsorted(timestamps, np.array(key_timestamps, dtype=np.float64))
+        else:
+            # Without packet access every frame is a potential seek target
+            keyframes = np.arange(len(timestamps))
+        return cls(timestamps, np.unique(keyframes))
+
+    def save(self, path: str, video_path: str):
+        np.savez(path, signature=_video_signature(video_path),
+                 timestamps_ms=self.timestamps_ms, keyframes=self.keyframes)
+
+    @classmethod
+    def load(cls, path: str, video_path: str) -> Optional['SeekIndex']:
+        """Load a sidecar index, or return None if it is stale or unreadable"""
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if not np.array_equal(data['signature'], _video_signature(video_path)):
+                    return None
+                return cls(data['timestamps_ms'], data['keyframes'])
+        except (OSError, KeyError, ValueError):
+            return None
+
+    @classmethod
+    def load_or_build(cls, video_path: str) -> Optional['SeekIndex']:
+        """Reuse the sidecar index of a video, building it on first open"""
+        path = sidecar_path(video_path)
+        if os.path.exists(path):
+            index = cls.load(path, video_path)
+            if index is not None:
+                return index
+        print("Building seek index (first open of this video)...")
+        index = cls.build(video_path)
+        if index is None:
+            print(f"Failed to index video: {video_path}")
+            return None
+        try:
+            index.save(path, video_path)
+        except OSError as e:
+            print(f"Could not save seek index: {e}")
+        return index
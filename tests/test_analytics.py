@@ -0,0 +1,94 @@
+import os
+import subprocess
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+from analytics import analyze_trajectories  # noqa: E402
+from calibration_io import CalibrationTransformer, save_calibration  # noqa: E402
+from dlc_data import read_dlc_file  # noqa: E402
+from synthetic import make_dataset  # noqa: E402
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    data = make_dataset(str(tmp_path / 'data'), frames=400, individuals=2, bodyparts=2, video=False, seed=3)
+    H = np.array(data['homography'])
+    coords, individuals, _, _ = read_dlc_file(data['csv_path'], use_cache=False)
+    calibration = CalibrationTransformer(H, world_points=np.array([[0.0, 0.0], [75.0, 75.0]]))
+    return data, coords, individuals, calibration
+
+
+class FailingCalibration(CalibrationTransformer):
+    """Raises on the second chunk, after the first has been written"""
+
+    calls = 0
+
+    def pixel_to_world(self, points):
+        self.calls += 1
+        if self.calls > 1:
+            raise RuntimeError("conversion failed")
+        return super().pixel_to_world(points)
+
+
+def test_chunk_size_does_not_change_results(dataset, tmp_path):
+    _, coords, individuals, calibration = dataset
+    zones = {'left': [[0.0, 0.0], [30.0, 0.0], [30.0, 75.0], [0.0, 75.0]]}
+    results = []
+    for chunk_size in (23, 50000):
+        output_path = str(tmp_path / f'kinematics_{chunk_size}.csv')
+        summary = analyze_trajectories(coords, calibration, 0, 30.0, individuals, zones=zones, max_gap=5,
+                                       chunk_size=chunk_size, output_path=output_path)
+        results.append((summary, pd.read_csv(output_path, header=[0, 1], index_col=0)))
+    (small, small_frames), (large, large_frames) = results
+    for name, stats in small['individuals'].items():
+        for key, value in stats.items():
+            if key == 'zone_dwell_s':
+                assert value == large['individuals'][name][key]
+            else:
+                assert value == pytest.approx(large['individuals'][name][key], rel=1e-9)
+    np.testing.assert_allclose(small['occupancy_s'], large['occupancy_s'])
+    pd.testing.assert_frame_equal(small_frames, large_frames)
+
+
+def test_output_must_not_overwrite_input(dataset):
+    data, coords, individuals, calibration = dataset
+    csv_path = data['csv_path']
+    with open(csv_path, 'rb') as f:
+        original = f.read()
+    with pytest.raises(ValueError):
+        analyze_trajectories(coords, calibration, 0, 30.0, individuals, output_path=csv_path, input_path=csv_path)
+    with open(csv_path, 'rb') as f:
+        assert f.read() == original
+
+
+def test_cli_rejects_output_equal_to_input(dataset, tmp_path):
+    data, _, _, calibration = dataset
+    csv_path = data['csv_path']
+    calibration_path = str(tmp_path / 'calibration.npz')
+    world = np.array([[0.0, 0.0], [75.0, 0.0], [75.0, 75.0], [0.0, 75.0]])
+    save_calibration(calibration_path, calibration.H, calibration.world_to_pixel(world), world, np.zeros(4),
+                     {'fps': 30.0, 'selected_bodypart': 'bp0'})
+    with open(csv_path, 'rb') as f:
+        original = f.read()
+    process = subprocess.run([sys.executable, os.path.join(ROOT, 'analytics.py'), csv_path, calibration_path,
+                              '-o', csv_path], capture_output=True, text=True)
+    assert process.returncode == 2
+    assert 'overwrite the input' in process.stderr
+    with open(csv_path, 'rb') as f:
+        assert f.read() == original
+
+
+def test_failed_run_keeps_previous_output(dataset, tmp_path):
+    _, coords, individuals, calibration = dataset
+    output_path = tmp_path / 'kinematics.csv'
+    output_path.write_text('previous output')
+    failing = FailingCalibration(calibration.H, world_points=calibration.world_points)
+    with pytest.raises(RuntimeError):
+        analyze_trajectories(coords, failing, 0, 30.0, individuals, chunk_size=100, output_path=str(output_path))
+    assert output_path.read_text() == 'previous output'
+    assert sorted(os.listdir(tmp_path)) == ['data', 'kinematics.csv']
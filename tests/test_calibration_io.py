@@ -0,0 +1,57 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from calibration_io import CalibrationTransformer, load_calibration, save_calibration  # noqa: E402
+from drift import ReferenceFeatures  # noqa: E402
+from lens_model import DivisionDistortion  # noqa: E402
+
+IMAGE_SIZE = (640, 480)
+H = np.array([[0.12, 0.01, -5.0], [0.002, 0.15, -3.0], [1e-5, 2e-4, 1.0]])
+DRIFT = np.array([[1.0, 0.01, 4.0], [-0.01, 1.0, -2.0], [0.0, 0.0, 1.0]])
+PIXEL = np.array([[100.0, 80.0], [520.0, 90.0], [560.0, 400.0], [90.0, 420.0], [320.0, 240.0]])
+WORLD = np.array([[0.0, 0.0], [75.0, 0.0], [75.0, 75.0], [0.0, 75.0], [37.5, 37.5]])
+
+
+@pytest.mark.parametrize('version', [1, 2, 3])
+def test_round_trip_keeps_mapping_and_version(tmp_path, version):
+    path = str(tmp_path / 'calibration.npz')
+    options = {}
+    if version >= 2:
+        options['distortion'] = DivisionDistortion(-0.15, IMAGE_SIZE)
+    if version >= 3:
+        options['drift'] = DRIFT
+        options['reference'] = ReferenceFeatures(np.random.default_rng(0).uniform(0, 400, (10, 2)),
+                                                 np.arange(320).reshape(10, 32) % 256, IMAGE_SIZE)
+    save_calibration(path, H, PIXEL, WORLD, np.arange(len(PIXEL)), {'fps': 25.0}, **options)
+    calibration = load_calibration(path)
+
+    assert calibration.metadata['format_version'] == version
+    assert calibration.metadata['fps'] == 25.0
+    np.testing.assert_allclose(calibration.H, H)
+    np.testing.assert_allclose(calibration.pixel_points, PIXEL)
+    np.testing.assert_allclose(calibration.world_points, WORLD)
+    np.testing.assert_array_equal(calibration.frames, np.arange(len(PIXEL)))
+    # The exact model the loaded calibration must reproduce; version 2+
+    # files read a lookup table, so allow for its interpolation error
+    exact = CalibrationTransformer(H, distortion=options.get('distortion'), drift=options.get('drift'))
+    samples = np.array([[150.0, 120.0], [300.0, 250.0], [450.0, 330.0]])
+    np.testing.assert_allclose(calibration.pixel_to_world(samples), exact.pixel_to_world(samples), atol=1e-3)
+    np.testing.assert_allclose(calibration.world_to_pixel(WORLD), exact.world_to_pixel(WORLD))
+    assert (calibration.lookup_table is not None) == (version >= 2)
+    if version == 3:
+        np.testing.assert_allclose(calibration.drift, DRIFT)
+        np.testing.assert_allclose(calibration.reference.keypoints, options['reference'].keypoints)
+        np.testing.assert_array_equal(calibration.reference.descriptors, options['reference'].descriptors)
+        assert calibration.reference.image_size == IMAGE_SIZE
+    else:
+        assert calibration.drift is None and calibration.reference is None
+
+
+def test_pickle_requires_opt_in(tmp_path):
+    path = tmp_path / 'calibration.pkl'
+    path.write_bytes(b'not a zip file')
+    with pytest.raises(ValueError):
+        load_calibration(str(path))
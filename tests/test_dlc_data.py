@@ -0,0 +1,34 @@
+import os
+import sys
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+from dlc_data import cache_paths, load_cache, read_dlc_file, save_cache  # noqa: E402
+from synthetic import make_dataset  # noqa: E402
+
+
+def test_cache_round_trip(tmp_path):
+    data = make_dataset(str(tmp_path), frames=120, individuals=2, bodyparts=3, video=False, seed=7)
+    csv_path = data['csv_path']
+    coords, individuals, bodyparts, scorer = read_dlc_file(csv_path, use_cache=False)
+    save_cache(csv_path, coords, individuals, bodyparts, scorer)
+    cached = load_cache(csv_path)
+    assert cached is not None
+    cached_coords, cached_individuals, cached_bodyparts, cached_scorer = cached
+    assert isinstance(cached_coords, np.memmap)
+    np.testing.assert_array_equal(cached_coords, coords)
+    assert (cached_individuals, cached_bodyparts, cached_scorer) == (individuals, bodyparts, scorer)
+    assert not [name for name in os.listdir(tmp_path) if '.tmp' in name]
+
+
+def test_cache_is_stale_after_csv_changes(tmp_path):
+    data = make_dataset(str(tmp_path), frames=60, individuals=1, bodyparts=2, video=False, seed=8)
+    csv_path = data['csv_path']
+    read_dlc_file(csv_path)
+    assert all(os.path.exists(path) for path in cache_paths(csv_path))
+    assert load_cache(csv_path) is not None
+    with open(csv_path, 'a') as f:
+        f.write('\n')
+    assert load_cache(csv_path) is None
@@ -0,0 +1,17 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_cli_rejects_output_equal_to_input(tmp_path):
+    # The output is checked before the calibration or video is read
+    video_path = tmp_path / 'video.mp4'
+    video_path.write_bytes(b'not really a video')
+    process = subprocess.run([sys.executable, os.path.join(ROOT, 'export_video.py'), str(video_path),
+                              str(tmp_path / 'missing.npz'), '-o', str(video_path)], capture_output=True, text=True)
+    assert process.returncode == 2
+    assert 'overwrite the input' in process.stderr
+    assert video_path.read_bytes() == b'not really a video'
+    assert os.listdir(tmp_path) == ['video.mp4']
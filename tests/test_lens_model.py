@@ -0,0 +1,24 @@
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lens_model import DivisionDistortion, PixelLookupTable  # noqa: E402
+
+
+def test_lookup_masks_nan_and_outside_points():
+    # 700 px at step 4 gives an even number of table columns
+    H = np.array([[0.1, 0.0, 1.0], [0.0, 0.1, 2.0], [0.0, 0.0, 1.0]])
+    table = PixelLookupTable.build(H, (700, 500), DivisionDistortion(-0.2, (700, 500)), step=4)
+    points = np.array([[np.nan, np.nan], [np.nan, 100.0], [-5.0, 10.0], [10.0, 900.0], [350.0, 250.0]])
+    world = table.lookup(points)
+    assert np.isnan(world[:4]).all()
+    assert np.isfinite(world[4]).all()
+
+
+def test_distort_inverts_undistort_for_strong_barrel():
+    image_size = (1280, 720)
+    corners = np.array([[0.0, 0.0], [1279.0, 0.0], [1279.0, 719.0], [0.0, 719.0], [640.0, 360.0]])
+    for k1 in (-0.6, -0.4, -0.1, 0.0, 0.3):
+        model = DivisionDistortion(k1, image_size)
+        np.testing.assert_allclose(model.distort(model.undistort(corners)), corners, atol=1e-6)
@@ -0,0 +1,80 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+from calibration_io import CalibrationTransformer  # noqa: E402
+from dlc_data import detect_header_rows  # noqa: E402
+from synthetic import make_dataset  # noqa: E402
+from transform import transform_dlc  # noqa: E402
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    data = make_dataset(str(tmp_path / 'data'), frames=300, individuals=2, bodyparts=3, video=False, seed=5)
+    return data, CalibrationTransformer(np.array(data['homography']))
+
+
+def read_output(path):
+    return pd.read_csv(path, header=detect_header_rows(path), index_col=0)
+
+
+def test_chunk_size_does_not_change_output(dataset, tmp_path):
+    data, calibration = dataset
+    small = str(tmp_path / 'small.csv')
+    large = str(tmp_path / 'large.csv')
+    summary_small = transform_dlc(data['csv_path'], None, small, chunk_size=7, calibration=calibration)
+    summary_large = transform_dlc(data['csv_path'], None, large, chunk_size=100000, calibration=calibration)
+    assert summary_small['rows'] == summary_large['rows'] == 300
+    assert summary_small['masked_points'] == summary_large['masked_points']
+    pd.testing.assert_frame_equal(read_output(small), read_output(large))
+
+
+def test_world_coordinates_match_calibration(dataset, tmp_path):
+    data, calibration = dataset
+    output = str(tmp_path / 'world.csv')
+    transform_dlc(data['csv_path'], None, output, likelihood_threshold=0.0, calibration=calibration)
+    source = read_output(data['csv_path'])
+    world = read_output(output)
+    column = source.columns[0][:-1]
+    pixel = source[column][['x', 'y']].to_numpy()
+    np.testing.assert_allclose(world[column][['x', 'y']].to_numpy(), calibration.pixel_to_world(pixel))
+    pd.testing.assert_series_equal(world[column]['likelihood'], source[column]['likelihood'])
+
+
+def test_output_must_not_overwrite_input(dataset):
+    data, calibration = dataset
+    csv_path = data['csv_path']
+    files = sorted(os.listdir(os.path.dirname(csv_path)))
+    with open(csv_path, 'rb') as f:
+        original = f.read()
+    with pytest.raises(ValueError):
+        transform_dlc(csv_path, None, csv_path, calibration=calibration)
+    with open(csv_path, 'rb') as f:
+        assert f.read() == original
+    assert sorted(os.listdir(os.path.dirname(csv_path))) == files
+
+
+def test_failed_run_keeps_previous_output(dataset, tmp_path):
+    data, calibration = dataset
+
+    class FailingCalibration(CalibrationTransformer):
+        calls = 0
+
+        def pixel_to_world(self, points):
+            self.calls += 1
+            if self.calls > 1:
+                raise RuntimeError("conversion failed")
+            return super().pixel_to_world(points)
+
+    output_path = tmp_path / 'world.csv'
+    output_path.write_text('previous output')
+    with pytest.raises(RuntimeError):
+        transform_dlc(data['csv_path'], None, str(output_path), chunk_size=50,
+                      calibration=FailingCalibration(calibration.H))
+    assert output_path.read_text() == 'previous output'
+    assert sorted(os.listdir(tmp_path)) == ['data', 'world.csv']
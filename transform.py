@@ -0,0 +1,161 @@
+import argparse
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from typing import Iterator, Optional, Tuple
+from calibration_io import CalibrationTransformer, load_calibration
+from dlc_data import detect_header_rows
+
+
+def coordinate_columns(columns: pd.MultiIndex) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Positions of the x, y and likelihood columns of every tracked point
+
+    Points are matched on all header levels except the last, so this covers
+    every bodypart of every individual. The likelihood position is -1 for
+    points without a likelihood column.
+    """
+    positions = {}
+    for i, column in enumerate(columns):
+        positions.setdefault(column[:-1], {})[column[-1]] = i
+    x_cols, y_cols, likelihood_cols = [], [], []
+    for fields in positions.values():
+        if 'x' in fields and 'y' in fields:
+            x_cols.append(fields['x'])
+            y_cols.append(fields['y'])
+            likelihood_cols.append(fields.get('likelihood', -1))
+    return np.array(x_cols, dtype=np.intp), np.array(y_cols, dtype=np.intp), np.array(likelihood_cols, dtype=np.intp)
+
+
+def _h5_key(store: pd.HDFStore) -> str:
+    keys = store.keys()
+    return '/df_with_missing' if '/df_with_missing' in keys else keys[0]
+
+
+def iter_dlc_chunks(input_path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Read a DeepLabCut CSV or H5 file in chunks of rows"""
+    if input_path.lower().endswith(('.h5', '.hdf5')):
+        with pd.HDFStore(input_path, mode='r') as store:
+            key = _h5_key(store)
+            storer = store.get_storer(key)
+            if storer.is_table:
+                for start in range(0, storer.nrows, chunk_size):
+                    yield store.select(key, start=start, stop=start + chunk_size)
+            else:
+                # Fixed-format files cannot be read partially
+                yield store.get(key)
+    else:
+        header = detect_header_rows(input_path)
+        yield from pd.read_csv(input_path, header=header, index_col=0, chunksize=chunk_size)
+
+
+def transform_chunk(chunk: pd.DataFrame, calibration: CalibrationTransformer,
+                    likelihood_threshold: float) -> Tuple[pd.DataFrame, int]:
+    """Convert all points of a chunk to world coordinates in one pass
+
+    Points with likelihood below the threshold become NaN. Returns the
+    converted chunk and the number of masked points.
+    """
+    x_cols, y_cols, likelihood_cols = coordinate_columns(chunk.columns)
+    values = chunk.to_numpy(dtype=np.float64, copy=True)
+    world = calibration.pixel_to_world(np.stack([values[:, x_cols], values[:, y_cols]], axis=-1))
+    world_x, world_y = world[..., 0], world[..., 1]
+    has_likelihood = likelihood_cols >= 0
+    low = np.zeros(world_x.shape, dtype=bool)
+    low[:, has_likelihood] = values[:, likelihood_cols[has_likelihood]] < likelihood_threshold
+    world_x[low] = np.nan
+    world_y[low] = np.nan
+    values[:, x_cols] = world_x
+    values[:, y_cols] = world_y
+    return pd.DataFrame(values, index=chunk.index, columns=chunk.columns), int(low.sum())
+
+
+def check_output_path(input_path: Optional[str], output_path: str):
+    """Raise ValueError when writing ``output_path`` would overwrite ``input_path``"""
+    if input_path and os.path.exists(output_path) and os.path.samefile(input_path, output_path):
+        raise ValueError(f"Output would overwrite the input file: {output_path}")
+
+
+def temporary_output_path(output_path: str) -> str:
+    """New uniquely named empty file next to ``output_path``, to os.replace onto it when complete
+
+    The extension is kept so writers that pick the format from it behave
+    the same. Permissions follow the umask like a normally created file.
+    """
+    root, ext = os.path.splitext(output_path)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(output_path) or '.',
+                                     prefix=os.path.basename(root) + '.', suffix=ext)
+    os.close(fd)
+    umask = os.umask(0)
+    os.umask(umask)
+    os.chmod(temp_path, 0o666 & ~umask)
+    return temp_path
+
+
+def transform_dlc(input_path: str, calibration_path: str, output_path: str,
+                  likelihood_threshold: float = 0.6, chunk_size: int = 100000,
+                  calibration: Optional[CalibrationTransformer] = None, allow_pickle: bool = False) -> dict:
+    """Convert a DeepLabCut CSV/H5 file to world coordinates
+
+    The output keeps the input layout, with x and y in world units and
+    likelihood unchanged. Writes H5 when ``output_path`` ends in .h5,
+    otherwise CSV. An already loaded ``calibration`` skips reading
+    ``calibration_path``.
+    """
+    check_output_path(input_path, output_path)
+    if calibration is None:
+        calibration = load_calibration(calibration_path, allow_pickle=allow_pickle)
+    to_h5 = output_path.lower().endswith(('.h5', '.hdf5'))
+    # Chunks go to a temporary file so a failed run never leaves a
+    # partial output or removes an existing one
+    temp_path = temporary_output_path(output_path)
+    rows = 0
+    masked = 0
+    try:
+        for chunk in iter_dlc_chunks(input_path, chunk_size):
+            world, n_masked = transform_chunk(chunk, calibration, likelihood_threshold)
+            if to_h5:
+                # The first chunk replaces the empty placeholder file
+                world.to_hdf(temp_path, key='df_with_missing', format='table', append=True,
+                             mode='a' if rows else 'w')
+            else:
+                world.to_csv(temp_path, mode='a', header=(rows == 0))
+            rows += len(world)
+            masked += n_masked
+        os.replace(temp_path, output_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return {'input_path': input_path, 'output_path': output_path, 'rows': rows, 'masked_points': masked}
+
+
+def default_output_path(input_path: str) -> str:
+    root, ext = os.path.splitext(input_path)
+    return f"{root}_world{ext}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert DeepLabCut coordinates to world coordinates")
+    parser.add_argument('input', help="DeepLabCut CSV or H5 file")
+    parser.add_argument('calibration', help="Saved calibration file")
+    parser.add_argument('-o', '--output', help="Output file (default: <input>_world.<ext>)")
+    parser.add_argument('--likelihood', type=float, default=0.6,
+                        help="Points below this likelihood are written as NaN (default: 0.6)")
+    parser.add_argument('--chunk-size', type=int, default=100000,
+                        help="Rows processed per chunk (default: 100000)")
+    parser.add_argument('--allow-pickle', action='store_true',
+                        help="Allow reading legacy .pkl calibrations (only from trusted sources)")
+    args = parser.parse_args()
+    output_path = args.output or default_output_path(args.input)
+    try:
+        summary = transform_dlc(args.input, args.calibration, output_path,
+                                likelihood_threshold=args.likelihood, chunk_size=args.chunk_size,
+                                allow_pickle=args.allow_pickle)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"Transformed {summary['rows']} frames -> {output_path}")
+    print(f"  Points masked as NaN (likelihood < {args.likelihood}): {summary['masked_points']}")
+
+
+if __name__ == "__main__":
+    main()